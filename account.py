@@ -1,11 +1,22 @@
 # from _pydatetime import timedelta
 
-import MetaTrader5 as mt5
-import pandas as pd
+from broker import mt5
 from datetime import datetime, time as dtime, timedelta
 import pytz
 import numpy as np
 from config import *
+from signals import EmaSignalEngine
+from bar_cache import BarCache
+from snapshot import MarketSnapshot
+from ledger import AccountLedger
+from session import TerminalSession
+from order_book import OrderBook
+from virtual_order import VirtualOrder, order_distances
+from monitor import BatchMonitor, ChangeGate
+from confirm import ConfirmationTracker
+from logs import get_logger
+from dispatch import MarginBudget, MarginTable, FillLog
+from profit import ProfitCalculator
 import time
 SOFIA_TZ = pytz.timezone("Europe/Sofia")
 
@@ -13,19 +24,35 @@ SOFIA_TZ = pytz.timezone("Europe/Sofia")
 class Account:
     ACCOUNTS = []
 
-    def __init__(self, name, login, password, server):
+    def __init__(self, name, login, password, server, path=None):
         self.name = name
         self.login = login
         self.password = password
         self.server = server
+        self.path = path    # terminal64.exe of this account's own MT5 install (None = default terminal)
+        self.session = None
         self.connected = False
-        self.open_orders = []
-        self.pending_orders = []
+        self.open_orders = OrderBook()
+        self.pending_orders = OrderBook()
         self.re_open_orders = []
         self.ban_swap = []
         self.ban_positions = {}
         self.re_ban_positions = {}
-        self.delay_orders = []
+        self.delay_orders = OrderBook()
+        self.profits = ProfitCalculator()
+        self.monitor = BatchMonitor(self.profits)
+        self.sltp_gate = ChangeGate()   # position ticket -> (sl, tp, real_sl, real_tp) last checked
+        self.confirmations = ConfirmationTracker()
+        self.fills = FillLog()
+        self.margins = MarginTable()
+        self.journal = None             # StateJournal, set by journal.load_account_state
+        self.log = get_logger("account", name)
+        self.report = get_logger("report", name)  # diagnostic reports (de-duplicated)
+        self.reports = {}               # diagnostic report -> input book contents last reported
+        self.bars = BarCache.shared(server)
+        self.signals = EmaSignalEngine(cache=self.bars)
+        self.ledger = AccountLedger()
+        self.market = MarketSnapshot(self.server, ledger=self.ledger)
         Account.ACCOUNTS.append(self)
 
     # -------------------- MARKET WAIT HELPERS --------------------
@@ -36,7 +63,7 @@ class Account:
             if now >= target_dt:
                 break
             seconds = (target_dt - now).total_seconds()
-            print(f"{self.name}: ⏳ Waiting {int(seconds // 60)} min...")
+            self.log.info(f"⏳ Waiting {int(seconds // 60)} min...")
             time.sleep(min(seconds, 60))
 
 
@@ -48,7 +75,7 @@ class Account:
 
         # Weekend: Sat(5) / Sun(6)
         if weekday >= 5:
-            print(f"{self.name}: Market closed (Weekend). Waiting until Monday 00:10...")
+            self.log.info("Market closed (Weekend). Waiting until Monday 00:10...")
 
             # Compute next Monday
             days_until_monday = (7 - weekday) % 7
@@ -66,98 +93,101 @@ class Account:
 
         # Weekday before 12:00
         if current_time < dtime(12, 0):
-            print(f"{self.name}: Market not active before 12:00. Waiting 15 minutes...")
+            self.log.info("Market not active before 12:00. Waiting 15 minutes...")
             target_dt = now + timedelta(minutes=15)
             self._wait_until(target_dt)
             return
 
-        print(f"{self.name}: Market assumed active.")
+        self.log.info("Market assumed active.")
         return
 
     # -------------------- CONNECTION --------------------
     def connect(self):
-        # First try initialize
-        if not mt5.initialize():
-            print(f"{self.name}: ❌ MT5 init failed:", mt5.last_error())
+        # Reuse the running terminal; only switch the logged-in account
+        self.session = TerminalSession.shared(self.path)
+
+        # First try initialize (no-op while the terminal is alive)
+        if not self.session.initialize():
+            self.log.error(f"❌ MT5 init failed: {self.session.last_error}")
             self.handle_market_close()
 
             # Retry after waiting
-            if not mt5.initialize():
-                print(f"{self.name}: ❌ Retry MT5 init failed:", mt5.last_error())
+            if not self.session.initialize(force=True):
+                self.log.error(f"❌ Retry MT5 init failed: {self.session.last_error}")
                 return False
 
         # Try login
-        if not mt5.login(self.login, password=self.password, server=self.server):
-            print(f"{self.name}: ❌ Login failed:", mt5.last_error())
+        if not self.session.login(self.login, self.password, self.server):
+            self.log.error(f"❌ Login failed: {self.session.last_error}")
             self.handle_market_close()
 
             # Retry after waiting
-            if not mt5.login(self.login, password=self.password, server=self.server):
-                print(f"{self.name}: ❌ Retry login failed:", mt5.last_error())
+            if not self.session.login(self.login, self.password, self.server):
+                self.log.error(f"❌ Retry login failed: {self.session.last_error}")
                 return False
 
         self.connected = True
-        print(f"{self.name}: ✅ Connected successfully.")
+        self.ledger = AccountLedger()
+        self.market = MarketSnapshot(self.server, ledger=self.ledger)
+        lat = self.session.latency()
+        self.log.info(f"✅ Connected successfully. "
+                      f"(init {lat['initialize']['last_ms']} ms x{lat['initialize']['count']}, "
+                      f"login {lat['login']['last_ms']} ms x{lat['login']['count']})")
         return True
 
+    # -------------------- PER-CYCLE MARKET SNAPSHOT --------------------
+    def begin_cycle(self):
+        """Capture ticks/info/account once for this cycle; every stage reads from self.market."""
+        self.confirm_orders()
+        self.ledger.refresh()
+        active = self.open_orders.symbols() | self.pending_orders.symbols() | self.delay_orders.symbols()
+        self.market = MarketSnapshot.capture(active, self.server, ledger=self.ledger)
+        return self.market
+
     def can_open_position(self, symbol=None, lot=0.01):
         """
         Check if the account has enough equity and margin to safely open a new position.
         Optionally checks symbol-specific required margin if symbol and lot are provided.
         """
-        info = mt5.account_info()
+        info = self.ledger.account_info()
         if info is None:
-            print(f"{self.name}: ❌ Failed to get account info")
+            self.log.error("❌ Failed to get account info")
             return False
 
-        equity = info.equity
-        margin = info.margin
-        free_margin = info.margin_free
-
-        # --- Handle stop-out data safely ---
-        stop_out_mode = getattr(info, "margin_so_mode", 0)
-        stop_out_call = getattr(info, "margin_so_call", 0.0)
-        stop_out_level = getattr(info, "margin_so_so", 0.0)  # stop-out level in %
-
-        # --- Compute minimum equity requirement ---
-        if stop_out_mode == 0:  # percent-based
-            stop_out_equity = margin * (stop_out_level / 100.0)
-        else:  # money or margin-based
-            stop_out_equity = stop_out_level
-
-        safety_buffer = 50.0  # EUR/USD equivalent buffer
-        min_equity_required = stop_out_equity + safety_buffer
-
-        if equity <= min_equity_required:
-            print(
-                f"{self.name}: ⚠️ Trade blocked: too close to stop-out! "
-                f"Equity={equity:.2f}, Required>={min_equity_required:.2f}"
+        budget = MarginBudget(info)
+        if not budget.healthy():
+            self.log.warning(
+                f"⚠️ Trade blocked: too close to stop-out! "
+                f"Equity={budget.equity:.2f}, Required>={budget.min_equity():.2f}"
             )
             return False
 
         # --- Optional: symbol-specific margin check ---
         if symbol and lot > 0:
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                print(f"{self.name}: ⚠️ Cannot get tick for {symbol}")
+            required_margin = self.required_margin(symbol, lot)
+            if required_margin is None:
                 return False
 
-            order_type = mt5.ORDER_TYPE_BUY  # margin same for buy/sell
-            try:
-                required_margin = mt5.order_calc_margin(order_type, symbol, lot, tick.ask)
-            except Exception as e:
-                print(f"{self.name}: ⚠️ Failed to calculate margin for {symbol}: {e}")
-                return False
-
-            if free_margin < required_margin:
-                print(
-                    f"{self.name}: ⚠️ Not enough free margin for {symbol} | "
-                    f"Required={required_margin:.2f}, Free={free_margin:.2f}"
+            if budget.free < required_margin:
+                self.log.warning(
+                    f"⚠️ Not enough free margin for {symbol} | "
+                    f"Required={required_margin:.2f}, Free={budget.free:.2f}"
                 )
                 return False
 
         return True
 
+    def required_margin(self, symbol, lot):
+        """Margin needed to open lot of symbol at the current ask, from the margin table (None if unknown)."""
+        if self.market.symbol_info_tick(symbol) is None:
+            self.log.warning(f"⚠️ Cannot get tick for {symbol}")
+            return None
+        try:
+            return self.margins.required(symbol, lot, self.market)
+        except Exception as e:
+            self.log.warning(f"⚠️ Failed to calculate margin for {symbol}: {e}")
+            return None
+
     # -------------------- STATIC: CHECK IF SYMBOL IS TRADABLE --------------------
 
     @staticmethod
@@ -199,39 +229,38 @@ class Account:
         return any(start <= current_time <= end for start, end in windows)
 
     # -------------------- FINDS CURRENT ACCOUNT INFO --------------------
-    @staticmethod
-    def get_account_info():
-        acc_info = mt5.account_info()
+    def get_account_info(self):
+        acc_info = self.market.account_info()
         if acc_info is None:
             return {}
         return acc_info._asdict()
     @staticmethod
-    def get_forex_pairs(money_type: str):
-        symbols = mt5.symbols_get()
+    def get_forex_pairs(money_type: str, market=mt5):
+        symbols = market.symbols_get()
         if not symbols:
             return []
         return [s.name for s in symbols if money_type.upper() in s.name]
     @staticmethod
-    def calc_virtual_profit(vo: dict, account_currency: str = "USD") -> dict:
+    def calc_virtual_profit(vo: VirtualOrder, account_currency: str = "USD", market=mt5) -> dict:
         """
         Calculate current virtual profit for a given order.
         Returns both profit in pips and in base account currency (USD/EUR).
         Automatically handles pip scaling and JPY pairs.
         """
 
-        symbol = vo.get("symbol")
+        symbol = vo.symbol
         if not symbol:
             return {"profit_pips": 0, f"profit_{account_currency.lower()}": 0}
 
-        info = mt5.symbol_info(symbol)
-        tick = mt5.symbol_info_tick(symbol)
+        info = market.symbol_info(symbol)
+        tick = market.symbol_info_tick(symbol)
         if not info or not tick:
             return {"profit_pips": 0, f"profit_{account_currency.lower()}": 0}
 
-        entry_price = vo.get("entry_price", tick.bid)
-        signal = vo.get("signal", "").lower()
+        entry_price = vo.entry_price if vo.entry_price is not None else tick.bid
+        signal = vo.signal.lower()
         order_type = 0 if signal == "buy" else 1
-        volume = vo.get("volume", 0.1)
+        volume = vo.volume
 
         # --- Pip & point calculation ---
         pip = 0.0001 if "JPY" not in symbol else 0.01
@@ -252,7 +281,7 @@ class Account:
 
         # --- If account is EUR, convert approx USD→EUR using EURUSD quote ---
         if account_currency.upper() == "EUR":
-            eurusd = mt5.symbol_info_tick("EURUSD")
+            eurusd = market.symbol_info_tick("EURUSD")
             if eurusd and eurusd.bid > 0:
                 profit_currency = profit_usd / eurusd.bid
             else:
@@ -268,151 +297,121 @@ class Account:
     # -------------------- CREATE A SIGNAL BUY SELL NONE --------------------
 
     def get_data(self, symbol):
-        now_sofia = pd.Timestamp.now(tz=SOFIA_TZ)
-        end_utc = now_sofia.tz_convert("UTC")
-
-        start = pd.Timestamp("2025-09-21", tz="UTC")
-
-        rates = mt5.copy_rates_range(
-            symbol,
-            mt5.TIMEFRAME_M5,
-            start,
-            end_utc
-        )
-
-        # Check return
-        if rates is None or len(rates) < 21:
-            return None
-
-        # Convert → DataFrame
-        df = pd.DataFrame(rates)
-
-        # Convert timestamp → datetime
-        df["time"] = pd.to_datetime(df["time"], unit="s")
+        """Return "buy" / "sell" / None from the incremental FAST/SLOW EMA engine."""
+        return self.signals.update(symbol)
 
-        # Compute EMA on closing prices
-        df["ema_fast"] = df["close"].ewm(span=8).mean()
-        df["ema_slow"] = df["close"].ewm(span=21).mean()
+    def get_signals(self, symbols):
+        """
+        Return {symbol: "buy" / "sell" / None} for many symbols in one vectorized pass.
 
-        ema_fast = df["ema_fast"].iloc[-1]
-        ema_slow = df["ema_slow"].iloc[-1]
+        Symbols whose tick has not changed since their last evaluation come
+        from the engine's memo without reading rates.
+        """
+        return self.signals.update_many(symbols, {s: self.market.symbol_info_tick(s) for s in symbols})
+
+    # -------------------- DIAGNOSTIC REPORTS --------------------
+    def _report_due(self, name, *books, force=False):
+        """True when a report's input books changed since it was last generated (or force)."""
+        # Keyed on contents: the pending book is replaced by a new OrderBook every dispatch
+        key = tuple(frozenset((p.symbol, p.signal, p.ticket, p.linked_real_order, p.volume, p.virtual)
+                              for p in b) for b in books)
+        if not force and self.reports.get(name) == key:
+            return False
+        self.reports[name] = key
+        return True
 
-        # Signal logic
-        if ema_fast > ema_slow:
-            return "buy"
-        elif ema_fast < ema_slow:
-            return "sell"
-        else:
-            return None
+    @staticmethod
+    def _order_line(p):
+        return (f"Symbol: {p.symbol} | Ticket: {p.ticket} | "
+                f"Signal: {p.signal} | Volume: {p.volume} | Virtual: {p.virtual}")
 
     # -------------------- PRINT PENDING ORDERS NOT IN OPEN --------------------
-    def print_pending_not_in_open(self):
+    def print_pending_not_in_open(self, force=False):
         """
-        Prints details of pending orders that do NOT exist in open_orders.
+        Logs details of pending orders that do NOT exist in open_orders
+        (only when either book changed, unless force).
         """
-        open_symbols = {o["symbol"] for o in self.open_orders}
-
-        pending_only = [p for p in self.pending_orders if p["symbol"] not in open_symbols]
+        if not self._report_due("pending_not_in_open", self.pending_orders, self.open_orders, force=force):
+            return
+        pending_only = self.pending_orders.only_in(self.open_orders)
 
         if not pending_only:
-            print(f"{self.name}: ✅ No pending orders outside open_orders.")
+            self.report.info("✅ No pending orders outside open_orders.")
             return
 
-        print(f"{self.name}: 🔹 Pending orders not in open_orders: {len(pending_only)}")
+        self.report.info(f"🔹 Pending orders not in open_orders: {len(pending_only)}")
         for p in pending_only:
-            print(f"Pending order | Symbol: {p['symbol']} | Ticket: {p.get('ticket')} | "
-                  f"Signal: {p['signal']} | Volume: {p['volume']} | Virtual: {p['virtual']}")
-        print("-" * 60)
+            self.report.debug(f"Pending order | {self._order_line(p)}")
 
     # -------------------- PRINT DELAY ORDERS  --------------------
-    def print_delay(self):
+    def print_delay(self, force=False):
         """
-        Compares delay_orders to open_orders and pending_orders.
-        Prints:
+        Compares delay_orders to open_orders and pending_orders
+        (only when one of them changed, unless force).
+        Logs:
          • Delay orders NOT in open_orders
          • Delay orders NOT in pending_orders
          • ALL delay_orders if any exist
         """
+        if not self._report_due("delay", self.delay_orders, self.open_orders, self.pending_orders, force=force):
+            return
 
-        open_symbols = {o["symbol"] for o in self.open_orders}
-        pending_symbols = {o["symbol"] for o in self.pending_orders}
-
-        not_in_open = [p for p in self.delay_orders if p["symbol"] not in open_symbols]
-        not_in_pending = [p for p in self.delay_orders if p["symbol"] not in pending_symbols]
+        not_in_open = self.delay_orders.only_in(self.open_orders)
+        not_in_pending = self.delay_orders.only_in(self.pending_orders)
 
-        # ==== 1) Print full delay list if exists ====
+        # ==== 1) Full delay list if exists ====
         if self.delay_orders:
-            print(f"{self.name}: 📋 ALL delay_orders: {len(self.delay_orders)}")
+            self.report.info(f"📋 ALL delay_orders: {len(self.delay_orders)}")
             for p in self.delay_orders:
-                print(f"   • Symbol: {p['symbol']} | Ticket: {p.get('ticket')} | "
-                      f"Signal: {p['signal']} | Volume: {p['volume']} | Virtual: {p['virtual']}")
-            print("-" * 60)
+                self.report.debug(f"   • {self._order_line(p)}")
         else:
-            print(f"{self.name}: ✅ No delay_orders stored.")
+            self.report.info("✅ No delay_orders stored.")
             return
 
         # ==== 2) Compare against open_orders ====
         if not_in_open:
-            print(f"{self.name}: 🔹 Delay orders NOT in open_orders: {len(not_in_open)}")
+            self.report.info(f"🔹 Delay orders NOT in open_orders: {len(not_in_open)}")
             for p in not_in_open:
-                print(f"   • Symbol: {p['symbol']} | Ticket: {p.get('ticket')} | "
-                      f"Signal: {p['signal']} | Volume: {p['volume']} | Virtual: {p['virtual']}")
+                self.report.debug(f"   • {self._order_line(p)}")
         else:
-            print(f"{self.name}: ✅ All delay_orders exist in open_orders.")
-
-        print("-" * 60)
+            self.report.info("✅ All delay_orders exist in open_orders.")
 
         # ==== 3) Compare against pending_orders ====
         if not_in_pending:
-            print(f"{self.name}: 🔹 Delay orders NOT in pending_orders: {len(not_in_pending)}")
+            self.report.info(f"🔹 Delay orders NOT in pending_orders: {len(not_in_pending)}")
             for p in not_in_pending:
-                print(f"   • Symbol: {p['symbol']} | Ticket: {p.get('ticket')} | "
-                      f"Signal: {p['signal']} | Volume: {p['volume']} | Virtual: {p['virtual']}")
+                self.report.debug(f"   • {self._order_line(p)}")
         else:
-            print(f"{self.name}: ✅ All delay_orders exist in pending_orders.")
-
-        print("-" * 60)
+            self.report.info("✅ All delay_orders exist in pending_orders.")
 
     # -------------------- COMPARE OPEN & PENDING ORDERS --------------------
-    def compare_open_pending_orders(self):
+    def compare_open_pending_orders(self, force=False):
         """
         Loops through open_orders and pending_orders.
-        If a symbol exists in both, print details side by side.
+        If a symbol exists in both, log details side by side
+        (only when either book changed, unless force).
         """
-        # Build dicts for quick lookup by symbol
-        open_dict = {o["symbol"]: o for o in self.open_orders}
-        pending_dict = {p["symbol"]: p for p in self.pending_orders}
-
-        # Check intersection
-        common_symbols = set(open_dict.keys()) & set(pending_dict.keys())
+        if not self._report_due("open_vs_pending", self.open_orders, self.pending_orders, force=force):
+            return
+        # Check intersection (both books are indexed by symbol)
+        common_symbols = self.open_orders.common(self.pending_orders)
 
         if not common_symbols:
-            print(f"{self.name}: ℹ️ No common symbols found in open_orders and pending_orders.")
+            self.report.info("ℹ️ No common symbols found in open_orders and pending_orders.")
             return
 
-        print(f"{self.name}: 🔍 Comparing open_orders vs pending_orders for {len(common_symbols)} common symbols:")
+        self.report.info(f"🔍 Comparing open_orders vs pending_orders for {len(common_symbols)} common symbols:")
 
         for symbol in common_symbols:
-            o = open_dict[symbol]
-            p = pending_dict[symbol]
-
-            print(f"1. Open order  | Symbol: {o['symbol']} | Ticket: {o.get('ticket')} | "
-                  f"Signal: {o['signal']} | Volume: {o['volume']} | Virtual: {o['virtual']}")
-            print(f"2. Pending order | Symbol: {p['symbol']} | Ticket: {p.get('ticket')} | "
-                  f"Signal: {p['signal']} | Volume: {p['volume']} | Virtual: {p['virtual']}")
-            print("-" * 60)
+            self.report.debug(f"1. Open order  | {self._order_line(self.open_orders.get(symbol))}")
+            self.report.debug(f"2. Pending order | {self._order_line(self.pending_orders.get(symbol))}")
 
     def get_exotic_pairs(self):
-        mapping = {
-            "USD": {"USDZAR", "USDMXN", "USDSEK", "USDNOK"},
-            "EUR": {"EURDKK", "EURHKD", "EURSGD", "EURTRY"},
-            # Add other account currencies if needed
-        }
-        return mapping.get(self.get_account_info().get("currency").upper(), set())
+        return EXOTIC_PAIRS.get(self.ledger.currency, set())
     # -------------------- HELPER: AUTODETECT FILL MODE --------------------
     def _get_fill_mode(self, symbol):
         """Return allowed fill mode for the given symbol"""
-        info = mt5.symbol_info(symbol)
+        info = self.market.symbol_info(symbol)
         if info is None:
             return mt5.ORDER_FILLING_FOK  # fallback
 
@@ -427,10 +426,10 @@ class Account:
     def apply_sl_tp_safe(self, pos, vo):
         symbol = pos.symbol
         entry = pos.price_open
-        sl = vo.get("real_sl")
-        tp = vo.get("real_tp")
-        stop_level = vo.get("stop_level", 0)
-        digits = vo.get("digits", 5)
+        sl = vo.real_sl
+        tp = vo.real_tp
+        stop_level = vo.stop_level
+        digits = vo.digits
 
         # Ignore null
         if sl is None and tp is None:
@@ -451,7 +450,7 @@ class Account:
             else:  # SELL
                 if sl <= entry: sl = round(entry + fix, digits)
                 if tp >= entry: tp = round(entry - fix, digits)
-            print(f"⚙ Auto-corrected SL/TP for {symbol}")
+            self.log.info(f"⚙ Auto-corrected SL/TP for {symbol}")
 
         # --- Min distance from entry ---
         if stop_level > 0:
@@ -481,16 +480,16 @@ class Account:
         }
 
         result = mt5.order_send(request)
-        print("modify", symbol, result)
+        self.log.info(f"modify {symbol} {result}")
         return result
 
     def create_virtual_order(self, symbol, signal, lot=VOL_ST):
         """Create a virtual order with proper SL/TP distances and broker safety adjustments."""
 
-        tick = mt5.symbol_info_tick(symbol)
-        info = mt5.symbol_info(symbol)
+        tick = self.market.symbol_info_tick(symbol)
+        info = self.market.symbol_info(symbol)
         if not tick or not info:
-            print(f"{self.name}: ⚠ Missing tick or symbol info for {symbol}")
+            self.log.warning(f"⚠ Missing tick or symbol info for {symbol}")
             return None
 
         ep = self.get_exotic_pairs()
@@ -500,12 +499,7 @@ class Account:
         stop_level = info.trade_stops_level * pip
 
         # --- Base distances ---
-        base_distance = FIX_MARGIN_REAL * pip
-        if symbol in ep:
-            base_distance *= VOL_MULT_FACTOR * 4.0
-
-        real_distance = max(base_distance, stop_level * 2)
-        virt_distance = real_distance / 2
+        real_distance, virt_distance = order_distances(pip, stop_level, exotic=symbol in ep)
 
         # --- Direction logic ---
         if signal.lower() == "buy":
@@ -521,29 +515,30 @@ class Account:
             real_sl = round(tick.ask + real_distance, digits)
             order_type = mt5.ORDER_TYPE_SELL
 
-        # --- Compose virtual order dict ---
-        vo = {
-            "ticket": f"VIRTUAL_{symbol}_{pd.Timestamp.now().floor('s')}",
-            "symbol": symbol,
-            "volume": lot,
-            "type": order_type,
-            "signal": signal.lower(),
-            "virtual_tp": virt_tp,
-            "virtual_sl": virt_sl,
-            "real_tp": real_tp,
-            "real_sl": real_sl,
-            "spread": round(spread, digits),
-            "linked_real_order": None,
-            "virtual": True,
-            "time": pd.Timestamp.now(),
-            "fill_mode": self._get_fill_mode(symbol),
-            "stop_level": stop_level,
-            "digits": digits
-        }
+        # --- Compose virtual order ---
+        now = time.time()
+        vo = VirtualOrder(
+            ticket=f"VIRTUAL_{symbol}_{datetime.fromtimestamp(now):%Y-%m-%d %H:%M:%S}",
+            symbol=symbol,
+            volume=lot,
+            type=order_type,
+            signal=signal.lower(),
+            virtual_tp=virt_tp,
+            virtual_sl=virt_sl,
+            real_tp=real_tp,
+            real_sl=real_sl,
+            spread=round(spread, digits),
+            linked_real_order=None,
+            virtual=True,
+            time=now,
+            fill_mode=self._get_fill_mode(symbol),
+            stop_level=stop_level,
+            digits=digits,
+        )
 
-        print(
-            f"{self.name}: ✅ Virtual order created -> {symbol} | Signal: {signal.upper()} "
-            f"| Spread: {vo['spread']:.{digits}f} | Fill mode: {vo['fill_mode']} | "
+        self.log.info(
+            f"✅ Virtual order created -> {symbol} | Signal: {signal.upper()} "
+            f"| Spread: {vo.spread:.{digits}f} | Fill mode: {vo.fill_mode} | "
             f"Real SL/TP adjusted OK"
         )
 
@@ -557,27 +552,27 @@ class Account:
             if pos_list:
                 pos = pos_list[0]
             else:
-                print(f"{self.name}: ℹ️ close_real_order: no position found for ticket {ticket}")
+                self.log.info(f"ℹ️ close_real_order: no position found for ticket {ticket}")
 
         if pos is None and symbol:
             pos_list = mt5.positions_get(symbol=symbol)
             if pos_list:
                 pos = pos_list[0]
-                print(f"{self.name}: ℹ️ close_real_order: found position ticket {pos.ticket} for {symbol}")
+                self.log.info(f"ℹ️ close_real_order: found position ticket {pos.ticket} for {symbol}")
 
         if pos is None:
-            print(f"{self.name}: ⚠️ close_real_order: no open position found (ticket={ticket}, symbol={symbol})")
+            self.log.warning(f"⚠️ close_real_order: no open position found (ticket={ticket}, symbol={symbol})")
             return False
 
         try:
             if pos.type == mt5.POSITION_TYPE_BUY:
                 close_type = mt5.ORDER_TYPE_SELL
-                price = mt5.symbol_info_tick(pos.symbol).bid
+                price = self.market.refresh_tick(pos.symbol).bid
             else:
                 close_type = mt5.ORDER_TYPE_BUY
-                price = mt5.symbol_info_tick(pos.symbol).ask
+                price = self.market.refresh_tick(pos.symbol).ask
         except Exception as e:
-            print(f"{self.name}: ⚠️ close_real_order: error determining price/type: {e}")
+            self.log.warning(f"⚠️ close_real_order: error determining price/type: {e}")
             return False
 
         fill_mode = self._get_fill_mode(pos.symbol)
@@ -598,35 +593,65 @@ class Account:
         for attempt in range(1, max_retries + 1):
             result = mt5.order_send(request)
             if result is None:
-                print(f"{self.name}: ❌ order_send() returned None (attempt {attempt})")
+                self.log.error(f"❌ order_send() returned None (attempt {attempt})")
             else:
-                print(
-                    f"{self.name}: ℹ️ close order_send retcode={getattr(result, 'retcode', None)}, comment={getattr(result, 'comment', None)}")
+                self.log.info(
+                    f"ℹ️ close order_send retcode={getattr(result, 'retcode', None)}, comment={getattr(result, 'comment', None)}")
 
                 if result.retcode == mt5.TRADE_RETCODE_DONE:
-                    for _ in range(8):
-                        time.sleep(0.25)
-                        if not mt5.positions_get(ticket=pos.ticket):
-                            print(f"{self.name}: 🧾 Closed real order {pos.ticket} ({pos.symbol}) confirmed.")
-                            self._cleanup_closed_position(pos.symbol, pos.ticket)
-                            return True
+                    self.ledger.release(self.required_margin(pos.symbol, pos.volume))
+                    # confirmed on a later cycle by confirm_orders()
+                    self.confirmations.expect_close(pos.ticket, pos.symbol)
+                    self.log.info(f"🧾 Closed real order {pos.ticket} ({pos.symbol}).")
+                    self._cleanup_closed_position(pos.symbol, pos.ticket)
+                    return True
                 #elif result.retcode in [mt5.TRADE_RETCODE_INVALID_FILL, mt5.TRADE_RETCODE_INVALID_PARAMS]:
                 elif result.retcode in [mt5.TRADE_RETCODE_INVALID_FILL]:
-                    # retry with alternate mode
+                    # retry with alternate mode; cached filling_mode is stale
+                    self.market.meta.invalidate(self.server, pos.symbol)
                     alt_mode = mt5.ORDER_FILLING_IOC if fill_mode == mt5.ORDER_FILLING_FOK else mt5.ORDER_FILLING_FOK
-                    print(f"{self.name}: 🔄 Retrying with alternate fill mode: {alt_mode}")
+                    self.log.info(f"🔄 Retrying with alternate fill mode: {alt_mode}")
                     request["type_filling"] = alt_mode
                     result = mt5.order_send(request)
                     if result and result.retcode == mt5.TRADE_RETCODE_DONE:
-                        print(f"{self.name}: ✅ Closed with alternate fill mode ({alt_mode}).")
+                        self.ledger.release(self.required_margin(pos.symbol, pos.volume))
+                        self.confirmations.expect_close(pos.ticket, pos.symbol)
+                        self.log.info(f"✅ Closed with alternate fill mode ({alt_mode}).")
                         self._cleanup_closed_position(pos.symbol, pos.ticket)
                         return True
 
             time.sleep(wait_between)
 
-        print(f"{self.name}: ⛔ Failed to close {pos.symbol} after {max_retries} attempts")
+        self.log.error(f"⛔ Failed to close {pos.symbol} after {max_retries} attempts")
         return False
 
+    # -------------------- CONFIRM SENT ORDERS --------------------
+    def confirm_orders(self):
+        """Resolve outstanding open/close confirmations with one positions_get() (no-op if none)."""
+        if not self.confirmations:
+            return
+        positions = mt5.positions_get()
+        if positions is None:
+            return
+        opened, closed, expired = self.confirmations.resolve(positions, self.open_orders.tickets.keys())
+
+        for vo, pos in opened:
+            if vo.linked_real_order != pos.ticket:
+                self.log.info(f"🔗 {vo.symbol} linked to position {pos.ticket} "
+                              f"(order ticket {vo.linked_real_order})")
+                self.open_orders.link(vo, pos.ticket)
+            vo.virtual = False
+
+        for symbol, ticket in closed:
+            self.log.info(f"🧾 Closed real order {ticket} ({symbol}) confirmed.")
+
+        for kind, symbol, ticket in expired:
+            if kind == "open":
+                self.log.warning(f"⚠️ Could not confirm linked real position for {symbol}")
+            else:
+                # still open: collect_positions() will adopt it again
+                self.log.warning(f"⚠️ Position {ticket} ({symbol}) still open after close")
+
     # -------------------- CLEANUP HELPER --------------------
     def _cleanup_closed_position(self, symbol: str, ticket: int = None):
         """
@@ -635,54 +660,52 @@ class Account:
         """
         # --- remove from open_orders / open_positions ---
         if hasattr(self, "open_orders"):
-            before = len(self.open_orders)
-            self.open_orders = [
-                o for o in self.open_orders
-                if o.get("symbol") != symbol and o.get("linked_real_order") != ticket
-            ]
-            after = len(self.open_orders)
-            if before != after:
-                print(f"{self.name}: 🧹 Removed {symbol} from open_orders (ticket={ticket}).")
+            if self.open_orders.remove_position(symbol, ticket):
+                self.log.info(f"🧹 Removed {symbol} from open_orders (ticket={ticket}).")
 
         # --- remove from ban_positions if present ---
         if symbol in getattr(self, "ban_positions", {}):
             del self.ban_positions[symbol]
-            print(f"{self.name}: 🚫 Unbanned {symbol} (closed position).")
+            self.log.info(f"🚫 Unbanned {symbol} (closed position).")
 
     def add_position_sl_tp(self):
         if not self.connected:
-            print(f"{self.name}: ⚠️ Not connected. Call .connect() first.")
+            self.log.warning("⚠️ Not connected. Call .connect() first.")
             return
 
         positions = mt5.positions_get()
         if positions is None:
-            print(f"{self.name}: ⚠️ No positions found or MT5 error ->", mt5.last_error())
+            self.log.warning(f"⚠️ No positions found or MT5 error -> {mt5.last_error()}")
             return
 
-        acc_info = self.get_account_info()
-        account_currency = acc_info.get("currency").upper()
+        # SL/TP placement depends only on the position and its order, not on the quote:
+        # skip positions whose SL/TP and target levels are unchanged since the last check
+        self.sltp_gate.prune(pos.ticket for pos in positions)
         for pos in positions:
-            symbol = pos.symbol
-
             # Find matching pending order object
-            vo = next((x for x in self.open_orders if x["symbol"] == pos.symbol), None)
+            vo = self.open_orders.get(pos.symbol)
             if not vo:
                 continue
+            if not self.sltp_gate.changed(pos.ticket, (pos.sl, pos.tp, vo.real_sl, vo.real_tp)):
+                continue
 
-            self.apply_sl_tp_safe(pos, vo)
+            result = self.apply_sl_tp_safe(pos, vo)
+            if result is not False and getattr(result, "retcode", None) != mt5.TRADE_RETCODE_DONE:
+                self.sltp_gate.forget(pos.ticket)
 
     # -------------------- EXECUTE REAL ORDER (robust linking) --------------------
-    def execute_virtual_order(self, vo):
-        symbol = vo["symbol"]
-        lot = vo["volume"]
-        order_type = vo["type"]
-        tick = mt5.symbol_info_tick(symbol)
+    def execute_virtual_order(self, vo, required=None):
+        """Send vo to the terminal; `required` is its margin if the caller already has it."""
+        symbol = vo.symbol
+        lot = vo.volume
+        order_type = vo.type
+        tick = self.market.refresh_tick(symbol)
         if not tick:
-            print(f"{self.name}: ⚠️ No tick for {symbol}")
+            self.log.warning(f"⚠️ No tick for {symbol}")
             return None
 
         price = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
-        fill_mode = vo.get("fill_mode", self._get_fill_mode(symbol))
+        fill_mode = vo.fill_mode if vo.fill_mode is not None else self._get_fill_mode(symbol)
 
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
@@ -690,55 +713,52 @@ class Account:
             "volume": lot,
             "type": order_type,
             "price": price,
-            # "sl": vo.get("real_sl"),
-            # "tp": vo.get("real_tp"),
+            # "sl": vo.real_sl,
+            # "tp": vo.real_tp,
             "deviation": 50,
             "magic": 123456,
-            "comment": f"{self.name} executed {vo['signal']}",
+            "comment": f"{self.name} executed {vo.signal}",
             "type_time": mt5.ORDER_TIME_GTC,
             "type_filling": fill_mode,
         }
 
+        sent = time.perf_counter()
         result = mt5.order_send(request)
         if result is None:
-            print(f"{self.name}: ❌ order_send() returned None for executing {symbol}")
+            self.log.error(f"❌ order_send() returned None for executing {symbol}")
             return None
 
         if result.retcode == mt5.TRADE_RETCODE_INVALID_FILL:
-            # try alternative mode
+            # try alternative mode; cached filling_mode is stale
+            self.market.meta.invalidate(self.server, symbol)
             alt_mode = mt5.ORDER_FILLING_IOC if fill_mode == mt5.ORDER_FILLING_FOK else mt5.ORDER_FILLING_FOK
-            print(f"{self.name}: 🔄 Retrying execute {symbol} with alternate fill mode {alt_mode}")
+            self.log.info(f"🔄 Retrying execute {symbol} with alternate fill mode {alt_mode}")
             request["type_filling"] = alt_mode
             result = mt5.order_send(request)
 
-        print(
-            f"{self.name}: ℹ️ execute order result -> retcode={getattr(result, 'retcode', None)}, order={getattr(result, 'order', None)}, comment={getattr(result, 'comment', None)}")
+        if result is not None:
+            info = self.market.symbol_info(symbol)
+            fill = self.fills.record(symbol, order_type, price, result,
+                                     (time.perf_counter() - sent) * 1000, info.point if info else 0.0)
+            self.log.info(f"⏱ {symbol} sent in {fill['ms']} ms, slippage {fill['slippage']:+.1f} pts")
+
+        self.log.info(
+            f"ℹ️ execute order result -> retcode={getattr(result, 'retcode', None)}, order={getattr(result, 'order', None)}, comment={getattr(result, 'comment', None)}")
 
         if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
-            print(
-                f"{self.name}: ⚠️ Failed to execute real order for {symbol}: retcode={result.retcode}, comment={result.comment}")
+            self.log.warning(
+                f"⚠️ Failed to execute real order for {symbol}: retcode={result.retcode}, comment={result.comment}")
             return None
+        self.ledger.reserve(required if required is not None else self.required_margin(symbol, lot))
 
-        # confirm linking
-        real_ticket = None
-        for _ in range(8):
-            pos_list = mt5.positions_get(symbol=symbol)
-            if pos_list:
-                for p in pos_list:
-                    if abs(p.volume - lot) < 1e-6:
-                        real_ticket = p.ticket
-                        break
-                if real_ticket:
-                    break
-            time.sleep(0.4)
-
-        if real_ticket:
-            vo["linked_real_order"] = real_ticket
-            vo["virtual"] = False
-            print(
-                f"{self.name}: 🧾 Real order executed for {symbol} [{vo['signal'].upper()}] → position ticket {real_ticket}")
-        else:
-            print(f"{self.name}: ⚠️ Could not confirm linked real position for {symbol}")
+        # Link right away: the position ticket is the order ticket from the result.
+        # confirm_orders() checks it on a later cycle instead of blocking here.
+        real_ticket = result.order or None
+        vo.linked_real_order = real_ticket
+        vo.virtual = False
+        self.confirmations.expect_open(vo, real_ticket)
+        self.log.info(
+            f"🧾 Real order executed for {symbol} [{vo.signal.upper()}] → position ticket {real_ticket}")
 
         return result
     # -------------------- COLLECT, SORT & BAN POSITIONS --------------------
@@ -749,12 +769,12 @@ class Account:
         Skips symbols that are banned, already in open_orders, or in pending_orders.
         """
         if not self.connected:
-            print(f"{self.name}: ⚠️ Not connected. Call .connect() first.")
+            self.log.warning("⚠️ Not connected. Call .connect() first.")
             return
 
         positions = mt5.positions_get()
         if positions is None:
-            print(f"{self.name}: ⚠️ No positions found or MT5 error ->", mt5.last_error())
+            self.log.warning(f"⚠️ No positions found or MT5 error -> {mt5.last_error()}")
             return
 
         acc_info = self.get_account_info()
@@ -769,16 +789,16 @@ class Account:
             # --- skip if symbol is banned, already in open_orders, or pending_orders ---
             if symbol in self.ban_positions:
                 continue
-            if any(o["symbol"] == symbol for o in self.open_orders):
+            if symbol in self.open_orders:
                 continue
-            if any(o["symbol"] == symbol for o in getattr(self, "pending_orders", [])):
+            if symbol in self.pending_orders:
                 continue
 
             # Get tick/info
-            info = mt5.symbol_info(symbol)
-            tick = mt5.symbol_info_tick(symbol)
+            info = self.market.symbol_info(symbol)
+            tick = self.market.symbol_info_tick(symbol)
             if not info or not tick:
-                print(f"{self.name}: ⚠️ Missing tick/info for {symbol}")
+                self.log.warning(f"⚠️ Missing tick/info for {symbol}")
                 continue
 
             lot = pos.volume
@@ -802,38 +822,38 @@ class Account:
                 order_type = mt5.ORDER_TYPE_SELL
 
             # --- unified VO structure ---
-            vo = {
-                "ticket": pos.ticket,
-                "symbol": symbol,
-                "volume": lot,
-                "type": order_type,
-                "signal": signal,
-                "entry_price": pos.price_open,
-                "virtual_tp": round(virt_tp, info.digits),
-                "virtual_sl": round(virt_sl, info.digits),
-                "real_tp": round(real_tp, info.digits) if real_tp else None,
-                "real_sl": round(real_sl, info.digits) if real_sl else None,
-                "linked_real_order": pos.ticket,
-                "virtual": False,
-                "time": pd.Timestamp.fromtimestamp(pos.time),
-            }
+            vo = VirtualOrder(
+                ticket=pos.ticket,
+                symbol=symbol,
+                volume=lot,
+                type=order_type,
+                signal=signal,
+                entry_price=pos.price_open,
+                virtual_tp=round(virt_tp, info.digits),
+                virtual_sl=round(virt_sl, info.digits),
+                real_tp=round(real_tp, info.digits) if real_tp else None,
+                real_sl=round(real_sl, info.digits) if real_sl else None,
+                linked_real_order=pos.ticket,
+                virtual=False,
+                time=float(pos.time),
+            )
 
             # --- create virtual order if not already in open_orders ---
             virt_order = self.create_virtual_order(symbol, signal, lot=lot)
             if virt_order:
                 # Check if ticket already exists
-                if any(o["ticket"] == virt_order["ticket"] for o in self.open_orders):
+                if self.open_orders.find_ticket(virt_order.ticket):
                     continue
-                vo["linked_virtual_order"] = virt_order
+                vo.linked_virtual_order = virt_order
 
             # --- append to open_orders and ban_positions ---
-            self.open_orders.append(vo)
+            self.open_orders.add(vo)
             self.ban_positions[symbol] = signal
 
             all_positions.append(vo)
 
-        print(
-            f"{self.name}: ✅ Positions collected: {len(all_positions)} | "
+        self.log.info(
+            f"✅ Positions collected: {len(all_positions)} | "
             # f"Positive: {len(self.positive)} / Negative: {len(self.negative)} | "
             f"Open orders: {len(self.open_orders)} | Account currency: {account_currency}"
         )
@@ -845,7 +865,7 @@ class Account:
         or already in open orders. Store them in self.pending_orders.
         """
         if not self.connected:
-            print(f"{self.name}: ⚠️ Not connected. Call .connect() first.")
+            self.log.warning("⚠️ Not connected. Call .connect() first.")
             return
 
         # --- Get account currency automatically ---
@@ -860,7 +880,7 @@ class Account:
         exclude_keywords = ("TRY","INDEX", "XAU", "XPT", "XPD", "XAG", "BTC", "ETH", "LTC", "XRP", "BCH", "DASH", "SOL", "UNI", "LINK", "ADA", "DOT", "DOGE", "ZEC", "XLM", "ETC", "ADA", "DOT", "DOGE", "ZEC", "XLM")
 
         # --- Get tradable symbols for account currency ---
-        forex_pairs_account = self.get_forex_pairs(currency)
+        forex_pairs_account = self.get_forex_pairs(currency, self.market)
 
         # --- Filter symbols: exclude if keyword appears anywhere in symbol ---
         filtered_symbols = [
@@ -868,41 +888,47 @@ class Account:
             if not any(keyword in s.upper() for keyword in exclude_keywords)
         ]
 
-        print(f"{self.name}: Account currency = {currency}, tradable symbols count = {len(filtered_symbols)}")
+        self.log.info(f"Account currency = {currency}, tradable symbols count = {len(filtered_symbols)}")
 
-        print(f"{self.name}: 🔍 Initializing virtual orders for {len(filtered_symbols)} symbols...")
+        self.log.info(f"🔍 Initializing virtual orders for {len(filtered_symbols)} symbols...")
 
         if not hasattr(self, "pending_orders"):
-            self.pending_orders = []
+            self.pending_orders = OrderBook()
 
 
 
+        candidates = []
         for pair in filtered_symbols:
             # Skip if symbol is banned or already in open_orders
             if pair in self.delay_orders:
                 continue
-            # if any(o["symbol"] == pair for o in self.open_orders):
+            # if any(o.symbol == pair for o in self.open_orders):
             #     continue
-            if any(o["symbol"] == pair for o in self.pending_orders):
+            if pair in self.pending_orders:
                 continue
 
             # Check symbol info
-            info = mt5.symbol_info(pair)
+            info = self.market.symbol_info(pair)
             if not info or info.trade_mode != mt5.SYMBOL_TRADE_MODE_FULL:
                 continue
 
-            # Get signal for pair (you already have get_data())
-            sig = self.get_data(pair)
+            candidates.append(pair)
+
+        # Get signals for all candidate pairs in one batch
+        signals = self.get_signals(candidates)
+
+        for pair in candidates:
+            sig = signals.get(pair)
             if not sig:
                 continue
 
             # Create virtual order
             vo = self.create_virtual_order(pair, sig)
             if vo:
-                self.pending_orders.append(vo)
-                #self.ban_positions[vo["symbol"]] = vo["signal"]
+                self.pending_orders.add(vo)
+                #self.ban_positions[vo.symbol] = vo.signal
 
-        print(f"{self.name}: ✅ Pending orders initialized: {len(self.pending_orders)}")
+        self.log.info(f"✅ Pending orders initialized: {len(self.pending_orders)}")
 
     # -------------------- MONITOR VIRTUAL ORDERS --------------------
     def monitor_virtual_orders(self):
@@ -919,48 +945,40 @@ class Account:
 
         account_currency = self.get_account_info().get("currency").upper()
 
-        for vo in list(self.open_orders):
-            symbol = vo["symbol"]
-            info = mt5.symbol_info(symbol)
-            tick = mt5.symbol_info_tick(symbol)
-            if not tick or not info:
-                continue
-
-            signal = vo["signal"]
-            order_type = vo["type"]
-            virt_tp, virt_sl = vo["virtual_tp"], vo["virtual_sl"]
-            current_price = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
-
-            # --- Check TP / SL hits ---
-            hit_tp = current_price > virt_tp if signal == "buy" else current_price < virt_tp
-            hit_sl = current_price < virt_sl if signal == "buy" else current_price > virt_sl
-
-            # --- Calculate current virtual profit ---
-            profit_data = self.calc_virtual_profit(vo, account_currency)
-            vo.update(profit_data)
-
-            print(f"{self.name}: 🔁 {symbol} {signal.upper()} | "
-                  f"P/L: {profit_data[f'profit_{account_currency.lower()}']:+.2f} "
-                  f"({profit_data['profit_pips']:+.1f} pips) | "
-                  f"Virt TP: {virt_tp:.5f} | SL: {virt_sl:.5f}")
-
-            # --- Handle TP / SL hit events ---
-            if hit_tp or hit_sl:
-                hit_type = "TP" if hit_tp else "SL"
-                print(f"{self.name}: 🎯 {symbol} → Virtual {hit_type} hit! Closing and reversing...")
-
-                if vo.get("linked_real_order"):
-                    old_ticket = vo["linked_real_order"]
-                    pos_info = mt5.positions_get(ticket=old_ticket)
-                    if pos_info:
-                        pos = pos_info[0]
-                        print(
-                            f"{self.name}: ⚙️ Attempting to close old real position for {symbol} (ticket {pos.ticket})")
-                        closed_ok = self.close_real_order(ticket=pos.ticket, symbol=pos.symbol)
-
-                        if not closed_ok:
-                            print(
-                                f"{self.name}: ⚠️ Failed to close old position for {symbol} (ticket {pos.ticket})")
+        # --- Evaluate TP / SL hits and P/L for every open order at once ---
+        self.monitor.sync(self.open_orders)
+        valid, hit_tp, hit_sl, profit_pips, profit = self.monitor.evaluate(self.market, account_currency)
+
+        for i in np.flatnonzero(valid):
+            vo = self.monitor.orders[i]
+            vo.profit_pips = float(profit_pips[i])
+            vo.profit = float(profit[i])
+
+            self.log.debug(f"🔁 {vo.symbol} {vo.signal.upper()} | "
+                           f"P/L: {vo.profit:+.2f} "
+                           f"({vo.profit_pips:+.1f} pips) | "
+                           f"Virt TP: {vo.virtual_tp:.5f} | SL: {vo.virtual_sl:.5f}")
+
+        # --- Handle TP / SL hit events (only triggered orders) ---
+        for i in np.flatnonzero(hit_tp | hit_sl):
+            vo = self.monitor.orders[i]
+            symbol = vo.symbol
+            hit_type = "TP" if hit_tp[i] else "SL"
+            self.log.info(f"🎯 {symbol} → Virtual {hit_type} hit! Closing and reversing...")
+
+            if vo.linked_real_order:
+                old_ticket = vo.linked_real_order
+                pos_info = mt5.positions_get(ticket=old_ticket)
+                if pos_info:
+                    pos = pos_info[0]
+                    self.log.info(
+                        f"⚙️ Attempting to close old real position for {symbol} (ticket {pos.ticket})")
+                    closed_ok = self.close_real_order(ticket=pos.ticket, symbol=pos.symbol)
+
+                    if not closed_ok:
+                        self.monitor.gate.forget(vo)     # retry on the next cycle, even without a new tick
+                        self.log.warning(
+                            f"⚠️ Failed to close old position for {symbol} (ticket {pos.ticket})")
 
     # -------------------- MONITOR NEGATIVE SWAP --------------------
     def apply_swap_to_orders(self):
@@ -976,10 +994,14 @@ class Account:
         acc_info = self.get_account_info()
         account_currency = acc_info.get("currency").upper()
 
-        for vo in list(self.open_orders):
-            symbol = vo["symbol"]
-            signal = vo["signal"]
-            info = mt5.symbol_info(symbol)
+        # --- Compute current profit for all open orders in one batch ---
+        orders = list(self.open_orders)
+        _, _, profits = self.profits.calc(orders, self.market, account_currency)
+
+        for vo, current_profit in zip(orders, profits.tolist()):
+            symbol = vo.symbol
+            signal = vo.signal
+            info = self.market.symbol_info(symbol)
             if not info:
                 continue
 
@@ -992,18 +1014,14 @@ class Account:
             elif "EUR" not in symbol and account_currency == "EUR":
                 swap_value /= 1.1
 
-            # --- Compute current profit ---
-            profit_data = self.calc_virtual_profit(vo, account_currency)
-            current_profit = profit_data.get(f"profit_{account_currency.lower()}", 0)
-
             # === CASE 1: Negative swap, profitable → CLOSE + BAN ===
             if swap_value < 0 < current_profit:
-                print(
-                    f"{self.name}: ⚠️ {symbol} has NEGATIVE swap ({swap_value:.2f}) and PROFIT {current_profit:+.2f} → closing before rollover.")
+                self.log.warning(
+                    f"⚠️ {symbol} has NEGATIVE swap ({swap_value:.2f}) and PROFIT {current_profit:+.2f} → closing before rollover.")
 
                 closed = False
-                if vo.get("linked_real_order"):
-                    pos_info = mt5.positions_get(ticket=vo["linked_real_order"])
+                if vo.linked_real_order:
+                    pos_info = mt5.positions_get(ticket=vo.linked_real_order)
                     if pos_info:
                         pos = pos_info[0]
                         closed = self.close_real_order(ticket=pos.ticket, symbol=pos.symbol)
@@ -1011,25 +1029,25 @@ class Account:
                     closed = self.close_real_order(symbol=symbol)
 
                 if closed:
-                    print(f"{self.name}: 💰 Closed {symbol} (locked profit, neg. swap). Added to ban_swap.")
+                    self.log.info(f"💰 Closed {symbol} (locked profit, neg. swap). Added to ban_swap.")
                     if symbol not in self.ban_swap:
                         self.ban_swap.append(symbol)
-                    self.open_orders.remove(vo)
+                    self.open_orders.discard(vo)
                 continue
 
             # === CASE 2: Negative swap, not profitable → KEEP ===
             if swap_value < 0 and current_profit <= 0:
-                print(
-                    f"{self.name}: 💤 {symbol} has NEGATIVE swap ({swap_value:.2f}) but still losing ({current_profit:+.2f}) → keeping open.")
+                self.log.info(
+                    f"💤 {symbol} has NEGATIVE swap ({swap_value:.2f}) but still losing ({current_profit:+.2f}) → keeping open.")
                 continue
 
             # === CASE 3: Positive swap → KEEP ===
             if swap_value > 0:
-                print(f"{self.name}: ✅ {symbol} has POSITIVE swap ({swap_value:.2f}) → keeping open.")
+                self.log.info(f"✅ {symbol} has POSITIVE swap ({swap_value:.2f}) → keeping open.")
                 continue
 
-        print(
-            f"{self.name}: 📋 Swap check complete — {len(self.ban_swap)} symbols banned due to negative swap with profit.")
+        self.log.info(
+            f"📋 Swap check complete — {len(self.ban_swap)} symbols banned due to negative swap with profit.")
 
     # -------------------- APPLY CLOSE TO ORDERS WITH NEGATIVE SWAP --------------------
     def manage_daily_swap_updates(self):
@@ -1048,108 +1066,137 @@ class Account:
 
         # --- Daily 23:40 swap refresh ---
         if dtime(23, 40) <= current_time <= dtime(23, 45):
-            print(f"{self.name}: ⏰ 23:40 Sofia — applying daily swap updates.")
+            self.log.info("⏰ 23:40 Sofia — applying daily swap updates.")
             self.apply_swap_to_orders()
 
         # --- Daily reset around midnight ---
         if dtime(0, 16) <= current_time <= dtime(0, 20):
             if self.ban_swap:
-                print(f"{self.name}: 🔄 {now.strftime('%A %H:%M')} — clearing {len(self.ban_swap)} swap-banned symbols.")
+                self.log.info(f"🔄 {now.strftime('%A %H:%M')} — clearing {len(self.ban_swap)} swap-banned symbols.")
                 self.ban_swap.clear()
             else:
-                print(f"{self.name}: 🧹 {now.strftime('%A %H:%M')} — ban_swap already empty.")
+                self.log.info(f"🧹 {now.strftime('%A %H:%M')} — ban_swap already empty.")
 
     def execute_delay_orders(self):
-        now = datetime.now()  # ✅ naive timestamp
+        now = time.time()  # ✅ epoch seconds, same as time_execute
 
         ready = [vo for vo in self.delay_orders
-                 if now >= vo["time_execute"]]  # ✅ same-type comparison
+                 if now >= vo.time_execute]
 
         for vo in ready:
-            symbol = vo["symbol"]
-            print(f"{self.name}: 🚀 Executing delayed VO for {symbol}")
+            symbol = vo.symbol
+            self.log.info(f"🚀 Executing delayed VO for {symbol}")
 
             result = self.execute_virtual_order(vo)
 
             if result:
-                self.open_orders.append(vo)
-                # self.ban_positions[symbol] = vo["signal"]
+                self.open_orders.add(vo)
+                # self.ban_positions[symbol] = vo.signal
 
             # remove executed order
-            self.delay_orders = [o for o in self.delay_orders if o is not vo]
+            self.delay_orders.discard(vo)
 
     def execute_pending_orders(self):
+        """
+        Dispatch pending orders in three passes:
+        1. screen: swap bans, and signal flips on symbols that already have a position
+        2. admit: check every new order against a local margin budget seeded from one
+           account snapshot (no account_info round-trip per order), using the margin
+           table's estimates in one pass
+        3. send: admitted orders go to the terminal back to back; fills are confirmed
+           later by confirm_orders(), latency/slippage land in self.fills
+        """
 
         if not self.connected:
-            print(f"{self.name}: ⚠️ Not connected. Call .connect() first.")
+            self.log.warning("⚠️ Not connected. Call .connect() first.")
             return
 
         if not hasattr(self, "pending_orders") or not self.pending_orders:
-            print(f"{self.name}: ⚠️ No pending orders to execute.")
+            self.log.warning("⚠️ No pending orders to execute.")
             return
 
-        acc_currency = self.get_account_info().get("currency").upper()
+        info = self.ledger.account_info()
+        if info is None:
+            self.log.error("❌ Failed to get account info")
+            return
+        budget = MarginBudget(info)
 
-        executed_count = 0
-        remaining_pending = []
+        remaining_pending = OrderBook()
+        to_open = []
 
+        # --- 1. Screen ---
         for vo in self.pending_orders:
-            symbol = vo["symbol"]
+            symbol = vo.symbol
 
             # --- Skip if swap-banned ---
             if symbol in getattr(self, "ban_swap", []):
-                print(f"{self.name}: 🚫 {symbol} is swap-banned. Skipping pending order.")
-                remaining_pending.append(vo)
+                self.log.info(f"🚫 {symbol} is swap-banned. Skipping pending order.")
+                remaining_pending.add(vo)
                 continue
 
-            # --- Margin safety check before executing ---
-            if not self.can_open_position():
-                print(f"{self.name}: ⚠️ Not enough margin to open {symbol}.")
-                remaining_pending.append(vo)
+            # --- Stop-out safety check before touching anything ---
+            if not budget.healthy():
+                self.log.warning(f"⚠️ Not enough margin to open {symbol}.")
+                remaining_pending.add(vo)
                 continue
 
-            open_pos = next((o for o in self.open_orders if o["symbol"] == symbol), None)
+            open_pos = self.open_orders.get(symbol)
             if not open_pos:
-                # execute
-                result = self.execute_virtual_order(vo)
-                if result:
-                    executed_count += 1
-                    self.open_orders.append(vo)
-
-                    # ✅ Remove from pending_orders (do NOT re-append to remaining list)
-                    print(
-                        f"{self.name}: ✅ Executed {executed_count} virtual orders, "
-                        f"{len(self.pending_orders) - executed_count} still pending."
-                    )
-                else:
-                    # execution failed → keep pending
-                    remaining_pending.append(vo)
+                to_open.append(vo)
             else:
                 # position already exists
-                pending_pos = next((o for o in self.delay_orders if o["symbol"] == symbol), None)
-                if pending_pos and pending_pos["signal"] != vo["signal"]:
+                pending_pos = self.delay_orders.get(symbol)
+                if pending_pos and pending_pos.signal != vo.signal:
                     pos_list = mt5.positions_get(symbol=symbol)
                     if pos_list:
                         for pos in pos_list:
-                            print(
-                                f"{self.name}: ⚙️ Closing existing position {pos.ticket} for {symbol} before executing new VO")
+                            self.log.info(
+                                f"⚙️ Closing existing position {pos.ticket} for {symbol} before executing new VO")
                             close_result = self.close_real_order(ticket=pos.ticket, symbol=symbol)
                             if close_result:
-                                now = datetime.now()
+                                now = time.time()
 
-                                dvo = {
-                                    **vo,
-                                    "time_created": now,
-                                    "time_execute": now + timedelta(minutes=9),
-                                    "comment": f"DELAY-SIGNAL-CHANGE {now.strftime('%Y-%m-%d %H:%M:%S')}"
-                                }
+                                dvo = vo.copy(
+                                    time_created=now,
+                                    time_execute=now + SIGNAL_FLIP_DELAY,
+                                    comment=f"DELAY-SIGNAL-CHANGE {datetime.fromtimestamp(now):%Y-%m-%d %H:%M:%S}"
+                                )
 
-                                self.delay_orders.append(dvo)
+                                self.delay_orders.add(dvo)
 
-                                print(
-                                    f"{self.name}: ⏳ Added DELAY for {symbol} — "
-                                    f"open:{open_pos['signal']} pending:{vo['signal']}"
+                                self.log.info(
+                                    f"⏳ Added DELAY for {symbol} — "
+                                    f"open:{open_pos.signal} pending:{vo.signal}"
                                 )
+
+        # --- 2. Admit against the local margin budget (table estimates, live only when borderline) ---
+        admitted = []
+        estimates = self.margins.screen([(vo.symbol, vo.volume) for vo in to_open], self.market)
+        for vo, estimate in zip(to_open, estimates):
+            required = self.margins.admit(budget, vo.symbol, vo.volume, estimate, self.market)
+            if required is None:
+                self.log.warning(f"⚠️ Not enough margin to open {vo.symbol}.")
+                remaining_pending.add(vo)
+                continue
+            admitted.append((vo, required))
+
+        # --- 3. Send admitted orders back to back ---
+        executed_count = 0
+        for vo, required in admitted:
+            result = self.execute_virtual_order(vo, required)
+            if result:
+                executed_count += 1
+                self.open_orders.add(vo)
+            else:
+                # execution failed → keep pending
+                remaining_pending.add(vo)
+
+        if admitted:
+            self.log.info(
+                f"✅ Executed {executed_count}/{len(admitted)} virtual orders, "
+                f"{len(remaining_pending)} still pending. Fills: {self.fills.summary(len(admitted))}"
+            )
+
         # ✅ Update list after loop
         self.pending_orders = remaining_pending
 
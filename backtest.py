@@ -0,0 +1,389 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from config import FAST, SLOW, FIX_MARGIN_REAL, VOL_ST, VOL_MULT_FACTOR, EXOTIC_PAIRS, SIGNAL_FLIP_DELAY
+from virtual_order import order_distances
+
+TRADE_DTYPE = np.dtype([
+    ("symbol", "U32"), ("side", "i1"), ("entry_time", "<i8"), ("exit_time", "<i8"),
+    ("entry", "<f8"), ("exit", "<f8"), ("volume", "<f8"),
+    ("profit_pips", "<f8"), ("profit", "<f8"), ("reason", "U4"),
+])
+
+RATE_FIELDS = ("time", "open", "high", "low", "close", "spread")
+EXIT_REASONS = ("tp", "sl", "flip", "end")
+
+
+# -------------------- LOADING --------------------
+def read_rates(path):
+    """
+    M5 bars from one file as a structured array (time, open, high, low, close, spread).
+
+    .npy: array saved from mt5.copy_rates_range()/copy_rates_from_pos().
+    .csv: header with time,open,high,low,close[,spread]; time is epoch seconds
+    or a date string. MT5 "Export Bars" files (<DATE> <TIME> <OPEN> ... tab
+    separated) load as-is. Spread is in points; 0 means unknown.
+    """
+    if path.endswith(".npy"):
+        raw = np.load(path)
+        rates = np.zeros(len(raw), dtype=[(f, "<i8" if f == "time" else "<f8") for f in RATE_FIELDS])
+        for field in RATE_FIELDS:
+            if field in raw.dtype.names:
+                rates[field] = raw[field]
+        return rates
+
+    frame = pd.read_csv(path, sep=None, engine="python")
+    frame.columns = [c.strip().strip("<>").lower() for c in frame.columns]
+    if "date" in frame.columns:
+        stamp = frame["date"].astype(str).str.replace(".", "-", regex=False) + " " + frame["time"].astype(str)
+    else:
+        stamp = frame["time"]
+    if pd.api.types.is_numeric_dtype(stamp):
+        times = stamp.to_numpy(dtype=np.int64)
+    else:
+        times = ((pd.to_datetime(stamp, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+
+    rates = np.zeros(len(frame), dtype=[(f, "<i8" if f == "time" else "<f8") for f in RATE_FIELDS])
+    rates["time"] = times
+    for field in RATE_FIELDS[1:]:
+        if field in frame.columns:
+            rates[field] = frame[field].to_numpy(dtype=float)
+    return np.sort(rates, order="time")
+
+
+def load_bars(directory, symbols=None):
+    """{symbol: rates} for every <SYMBOL>.npy / <SYMBOL>.csv in directory."""
+    bars = {}
+    for name in sorted(os.listdir(directory)):
+        symbol, ext = os.path.splitext(name)
+        if ext not in (".npy", ".csv") or (symbols and symbol not in symbols):
+            continue
+        bars[symbol] = read_rates(os.path.join(directory, name))
+    return bars
+
+
+# -------------------- BAR GRID --------------------
+class BarGrid:
+    """
+    M5 bars of many symbols aligned on one sorted time axis.
+
+    open/high/low/close/spread are (bars x symbols) arrays with NaN where a
+    symbol has no bar; spread is in points (0 = unknown). Nothing here
+    depends on strategy parameters, so one grid can be saved once and
+    memory-mapped read-only by any number of backtests (see sweep.py).
+    """
+    FIELDS = ("open", "high", "low", "close", "spread")
+
+    def __init__(self, symbols, times, **cols):
+        self.symbols = list(symbols)
+        self.times = times
+        self.open = cols["open"]
+        self.high = cols["high"]
+        self.low = cols["low"]
+        self.close = cols["close"]
+        self.spread = cols["spread"]
+
+    @classmethod
+    def from_bars(cls, bars):
+        """Build from {symbol: rates} as returned by load_bars()."""
+        symbols = sorted(s for s in bars if len(bars[s]))
+        times = np.unique(np.concatenate([bars[s]["time"] for s in symbols])) if symbols else np.empty(0, np.int64)
+        cols = {f: np.full((len(times), len(symbols)), np.nan) for f in cls.FIELDS}
+        for j, symbol in enumerate(symbols):
+            rates = bars[symbol]
+            rows = np.searchsorted(times, rates["time"])
+            for f in cls.FIELDS:
+                cols[f][rows, j] = rates[f]
+        return cls(symbols, times, **cols)
+
+    def save(self, directory):
+        """One .npy per array plus symbols.json, loadable with load(mmap_mode="r")."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "times.npy"), self.times)
+        for f in self.FIELDS:
+            np.save(os.path.join(directory, f"{f}.npy"), getattr(self, f))
+        with open(os.path.join(directory, "symbols.json"), "w", encoding="utf-8") as fh:
+            json.dump(self.symbols, fh)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "symbols.json"), encoding="utf-8") as fh:
+            symbols = json.load(fh)
+        # np.asarray keeps the mapping but drops the slow np.memmap subclass on every row access
+        times = np.asarray(np.load(os.path.join(directory, "times.npy"), mmap_mode=mmap_mode))
+        cols = {f: np.asarray(np.load(os.path.join(directory, f"{f}.npy"), mmap_mode=mmap_mode))
+                for f in cls.FIELDS}
+        return cls(symbols, times, **cols)
+
+
+# -------------------- RESULT --------------------
+class BacktestResult:
+    """Closed trades plus the realized equity curve on the common bar grid."""
+
+    def __init__(self, trades, times, equity):
+        self.trades = trades
+        self.times = times
+        self.equity = equity
+
+    def summary(self):
+        trades = self.trades
+        peak = np.maximum.accumulate(np.concatenate([[0.0], self.equity]))
+        return {
+            "trades": int(len(trades)),
+            "wins": int((trades["profit"] > 0).sum()),
+            "win_rate": round(float((trades["profit"] > 0).mean()), 4) if len(trades) else 0.0,
+            "profit": round(float(trades["profit"].sum()), 2),
+            "profit_pips": round(float(trades["profit_pips"].sum()), 1),
+            "max_drawdown": round(float((peak[1:] - self.equity).max()), 2) if len(self.equity) else 0.0,
+            "exits": {r: int((trades["reason"] == r).sum()) for r in EXIT_REASONS},
+        }
+
+    def by_symbol(self):
+        out = {}
+        for symbol in np.unique(self.trades["symbol"]):
+            t = self.trades[self.trades["symbol"] == symbol]
+            out[str(symbol)] = {"trades": int(len(t)), "profit": round(float(t["profit"].sum()), 2)}
+        return out
+
+
+# -------------------- ENGINE --------------------
+class Backtest:
+    """
+    Replays M5 bars through the Account strategy for all symbols at once.
+
+    Bars of every symbol are aligned on one time grid and each step advances
+    all symbols with NumPy array operations, so cost is O(bars) Python steps
+    regardless of the number of symbols. Rules follow the live bot:
+
+    - FAST/SLOW EMA (adjusted sums, as EmaSignalEngine) on closed bars; a
+      signal at bar close is acted on at the next bar's open.
+    - Flat symbol with a signal: open at ask (buy) / bid (sell) with
+      order_distances() levels — margin_real points (FIX_MARGIN_REAL),
+      vol_mult (VOL_MULT_FACTOR) for EXOTIC_PAIRS, virtual TP/SL at half
+      the real distance.
+    - Virtual TP/SL use BatchMonitor's price side (ask for buys, bid for
+      sells) against the bar high/low; SL wins if both are hit in one bar,
+      gaps fill at the open. Real levels are twice as far and never trigger
+      first, so they are not simulated separately.
+    - Signal flip while in a position: close at the next open, re-enter the
+      new direction after SIGNAL_FLIP_DELAY (ignoring signals meanwhile).
+
+    P/L uses the repo's $10 per pip per lot approximation times conversion.
+    """
+
+    def __init__(self, fast=FAST, slow=SLOW, lot=VOL_ST, margin_real=FIX_MARGIN_REAL, vol_mult=VOL_MULT_FACTOR,
+                 currency="USD", meta=None, spread=10, flip_delay=SIGNAL_FLIP_DELAY, conversion=1.0):
+        self.fast = fast
+        self.slow = slow
+        self.lot = lot
+        self.margin_real = margin_real
+        self.vol_mult = vol_mult
+        self.exotic = EXOTIC_PAIRS.get(currency.upper(), set())
+        self.meta = meta or {}          # symbol -> SymbolMeta-like (point, digits, trade_stops_level)
+        self.spread = spread            # points, used where bars carry no spread
+        self.flip_delay = flip_delay
+        self.conversion = conversion
+
+    def _spec(self, symbol):
+        meta = self.meta.get(symbol)
+        if meta is not None:
+            return meta.point, meta.digits, meta.trade_stops_level
+        digits = 3 if "JPY" in symbol else 5
+        return 10.0 ** -digits, digits, 0
+
+    def signals(self, grid):
+        """
+        (bars x symbols) int8 grid of EMA signals at each bar close: 1 buy, -1 sell, 0 none.
+        Same adjusted EWM as EmaSignalEngine; no signal before SLOW bars or where a symbol has no bar.
+        """
+        out = np.zeros(grid.close.shape, dtype=np.int8)
+        for j in range(len(grid.symbols)):
+            rows = np.flatnonzero(~np.isnan(grid.close[:, j]))
+            close = pd.Series(grid.close[rows, j])
+            diff = (close.ewm(span=self.fast).mean() - close.ewm(span=self.slow).mean()).to_numpy()
+            signal = (diff > 0).astype(np.int8) - (diff < 0)
+            signal[:self.slow - 1] = 0
+            out[rows, j] = signal
+        return out
+
+    def run(self, bars):
+        """Backtest {symbol: rates} or a prepared BarGrid; returns a BacktestResult."""
+        grid = bars if isinstance(bars, BarGrid) else BarGrid.from_bars(bars)
+        symbols, times = grid.symbols, grid.times
+        n_bars, n = grid.close.shape
+
+        # --- Per-symbol contract data ---
+        point = np.empty(n)
+        scale = np.empty(n)
+        virt_d = np.empty(n)
+        for j, symbol in enumerate(symbols):
+            p, digits, stops = self._spec(symbol)
+            point[j], scale[j] = p, 10.0 ** digits
+            virt_d[j] = order_distances(p, stops * p, exotic=symbol in self.exotic,
+                                        margin=self.margin_real, mult=self.vol_mult)[1]
+        pip = np.array([0.01 if "JPY" in s else 0.0001 for s in symbols])
+        present = ~np.isnan(grid.open)
+        signals = self.signals(grid)
+
+        # --- Per-symbol state ---
+        side = np.zeros(n, dtype=np.int8)       # open position: 1 buy, -1 sell, 0 flat
+        entry = np.full(n, np.nan)
+        vtp = np.full(n, np.nan)
+        vsl = np.full(n, np.nan)
+        opened = np.zeros(n, dtype=np.int64)      # grid row of the entry
+        queued = np.zeros(n, dtype=np.int8)     # signal to open at the next bar
+        flip = np.zeros(n, dtype=np.int8)       # close at next bar, then delay this side
+        delayed = np.zeros(n, dtype=np.int8)
+        ready_at = np.zeros(n, dtype=np.int64)
+
+        last_t = np.zeros(n, dtype=np.int64)   # last grid row with a bar, per symbol
+        closed = []                             # (idx, side, entry_row, exit_row, entry, exit, reason)
+
+        def close(idx, t, price, reason):
+            closed.append((idx, side[idx], opened[idx], np.full(idx.shape, t), entry[idx], price,
+                           np.full(idx.shape, EXIT_REASONS.index(reason), dtype=np.int8)))
+            side[idx] = 0
+
+        for t in range(n_bars):
+            now = times[t]
+            op, hi, lo, has = grid.open[t], grid.high[t], grid.low[t], present[t]
+            spr = np.where(grid.spread[t] > 0, grid.spread[t], self.spread) * point
+            last_t[has] = t
+
+            # --- 1) Signal-flip closes at the open, re-entry goes on delay ---
+            idx = np.flatnonzero(has & (flip != 0))
+            if idx.size:
+                close(idx, t, np.where(side[idx] > 0, op[idx], op[idx] + spr[idx]), "flip")
+                delayed[idx] = flip[idx]
+                ready_at[idx] = now + self.flip_delay
+                flip[idx] = 0
+
+            # --- 2) Entries at the open: due delay orders, else the queued signal ---
+            due = has & (delayed != 0) & (now >= ready_at)
+            go = np.where(due, delayed, np.where(delayed == 0, queued, 0))
+            idx = np.flatnonzero(has & (side == 0) & (go != 0))
+            if idx.size:
+                s = go[idx]
+                bid, ask, d, k = op[idx], op[idx] + spr[idx], virt_d[idx], scale[idx]
+                side[idx] = s
+                entry[idx] = np.where(s > 0, ask, bid)
+                vtp[idx] = np.round(np.where(s > 0, ask + d, bid - d) * k) / k
+                vsl[idx] = np.round(np.where(s > 0, bid - d, ask + d) * k) / k
+                opened[idx] = t
+            delayed[due] = 0
+            queued[has] = 0
+
+            # --- 3) Virtual TP / SL inside the bar (SL first when both are touched) ---
+            live = has & (side != 0)
+            if live.any():
+                buy = side > 0
+                hit_sl = live & np.where(buy, lo + spr < vsl, hi > vsl)
+                hit_tp = live & ~hit_sl & np.where(buy, hi + spr > vtp, lo < vtp)
+                idx = np.flatnonzero(hit_sl)
+                if idx.size:
+                    price = np.where(buy[idx], np.minimum(op[idx], vsl[idx] - spr[idx]),
+                                     np.maximum(op[idx], vsl[idx]) + spr[idx])
+                    close(idx, t, price, "sl")
+                idx = np.flatnonzero(hit_tp)
+                if idx.size:
+                    price = np.where(buy[idx], np.maximum(op[idx], vtp[idx] - spr[idx]),
+                                     np.minimum(op[idx], vtp[idx]) + spr[idx])
+                    close(idx, t, price, "tp")
+
+            # --- 4) Orders for the next open from this bar's close ---
+            signal = signals[t]
+            flat = has & (side == 0) & (delayed == 0)
+            queued[flat] = signal[flat]
+            reverse = (side != 0) & (flip == 0) & (signal != 0) & (signal != side)
+            flip[reverse] = signal[reverse]
+
+        # --- Close what is still open at each symbol's last bar ---
+        idx = np.flatnonzero(side != 0)
+        if idx.size:
+            rows = last_t[idx]
+            last_close = grid.close[rows, idx]
+            last_spread = np.where(grid.spread[rows, idx] > 0, grid.spread[rows, idx], self.spread) * point[idx]
+            close(idx, rows, np.where(side[idx] > 0, last_close, last_close + last_spread), "end")
+
+        # --- Build the trade list and equity curve once ---
+        if closed:
+            idx, sides, entry_rows, exit_rows, entries, exits, reasons = (
+                np.concatenate([c[k] for c in closed]) for k in range(7))
+        else:
+            idx = sides = entry_rows = exit_rows = reasons = np.zeros(0, dtype=np.int64)
+            entries = exits = np.zeros(0)
+        pips = (exits - entries) * sides / pip[idx]
+        profit = pips * 10 * self.lot * self.conversion
+
+        trades = np.zeros(len(idx), dtype=TRADE_DTYPE)
+        trades["symbol"] = np.array(symbols, dtype="U32")[idx] if symbols else ""
+        trades["side"] = sides
+        trades["entry_time"] = times[entry_rows]
+        trades["exit_time"] = times[exit_rows]
+        trades["entry"] = entries
+        trades["exit"] = exits
+        trades["volume"] = self.lot
+        trades["profit_pips"] = np.round(pips, 2)
+        trades["profit"] = np.round(profit, 2)
+        trades["reason"] = np.array(EXIT_REASONS)[reasons]
+        order = np.argsort(trades["exit_time"], kind="stable")
+
+        realized = np.zeros(n_bars)
+        np.add.at(realized, exit_rows, profit)
+        return BacktestResult(trades[order], times, np.cumsum(realized))
+
+
+def _epoch(day):
+    return int(pd.Timestamp(day, tz="UTC").timestamp()) if day else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the EMA + virtual TP/SL strategy on local M5 bars.")
+    parser.add_argument("data", help="directory with <SYMBOL>.csv / <SYMBOL>.npy M5 bars")
+    parser.add_argument("--symbols", help="comma separated subset")
+    parser.add_argument("--start", help="first day (UTC), e.g. 2025-06-01")
+    parser.add_argument("--end", help="last day (UTC, exclusive)")
+    parser.add_argument("--currency", default="USD", help="account currency (selects EXOTIC_PAIRS)")
+    parser.add_argument("--lot", type=float, default=VOL_ST)
+    parser.add_argument("--spread", type=float, default=10, help="points, where bars have no spread")
+    parser.add_argument("--meta", help="symbol_meta.json for point/digits/stop level")
+    parser.add_argument("--server", help="server block to use from --meta")
+    parser.add_argument("--trades", help="write closed trades to this CSV")
+    args = parser.parse_args(argv)
+
+    bars = load_bars(args.data, set(args.symbols.split(",")) if args.symbols else None)
+    start, end = _epoch(args.start), _epoch(args.end)
+    for symbol, rates in bars.items():
+        keep = np.ones(len(rates), dtype=bool)
+        if start:
+            keep &= rates["time"] >= start
+        if end:
+            keep &= rates["time"] < end
+        bars[symbol] = rates[keep]
+
+    meta = {}
+    if args.meta:
+        from symbol_cache import SymbolMetaCache
+        cache = SymbolMetaCache(ttl=float("inf"), path=args.meta)
+        meta = {symbol: m for (server, symbol), (_, m) in cache.entries.items()
+                if args.server is None or server == args.server}
+
+    result = Backtest(lot=args.lot, currency=args.currency, meta=meta, spread=args.spread).run(bars)
+    summary = result.summary()
+    print(f"📈 {len(bars)} symbols | {len(result.times)} bars | {summary['trades']} trades | "
+          f"win rate {summary['win_rate']:.1%} | P/L {summary['profit']:+.2f} "
+          f"({summary['profit_pips']:+.1f} pips) | max DD {summary['max_drawdown']:.2f}")
+    print(f"   exits: {summary['exits']}")
+    for symbol, row in result.by_symbol().items():
+        print(f"   {symbol:<10} {row['trades']:>5} trades | P/L {row['profit']:+.2f}")
+
+    if args.trades:
+        pd.DataFrame(result.trades).to_csv(args.trades, index=False)
+        print(f"💾 Trades written to {args.trades}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
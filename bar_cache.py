@@ -0,0 +1,138 @@
+from broker import mt5
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from config import HISTORY_START, BAR_CACHE_SIZE, BAR_STORE_DIR
+from logs import get_logger
+
+log = get_logger("bars")
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, time-ordered store of MT5 rate rows.
+
+    Every row is written twice (at i and i + capacity) so the live window is
+    always one contiguous slice and view() never has to copy.
+    """
+
+    def __init__(self, dtype, capacity=BAR_CACHE_SIZE):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=dtype)
+        self.head = 0   # next write position (0..capacity-1)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def view(self):
+        """Oldest → newest rows as a view into the buffer (valid until the next write)."""
+        start = (self.head - self.size) % self.capacity
+        return self.data[start:start + self.size]
+
+    def last_time(self):
+        return int(self.data["time"][(self.head - 1) % self.capacity]) if self.size else 0
+
+    def append(self, rows):
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        n = len(rows)
+        if not n:
+            return
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.data[idx] = rows
+        self.data[idx + self.capacity] = rows
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def replace_last(self, row):
+        idx = (self.head - 1) % self.capacity
+        self.data[idx] = row
+        self.data[idx + self.capacity] = row
+
+
+class BarCache:
+    """
+    Per-symbol rate cache for one timeframe, shared by everything that reads bars.
+
+    update() only asks the terminal for the missing tail (from the last stored
+    bar, so the forming bar is refreshed in place). Memory per symbol is capped
+    at BAR_CACHE_SIZE bars no matter how long the process runs.
+
+    With a BarStore, a symbol's first update() seeds the buffer from the
+    mapped on-disk history and only requests the gap since its last bar;
+    closed bars fetched afterwards are appended to the store. A failed
+    append is logged and retried from the buffer on the next update.
+    """
+    SHARED = {}
+    STORE_DIR = BAR_STORE_DIR   # used by shared(); None keeps everything in memory
+
+    def __init__(self, timeframe=None, capacity=BAR_CACHE_SIZE, start=HISTORY_START, store=None):
+        self.timeframe = mt5.TIMEFRAME_M5 if timeframe is None else timeframe
+        self.capacity = capacity
+        self.start = pd.Timestamp(start, tz="UTC")
+        self.store = store
+        self.buffers = {}
+        self.unstored = set()   # symbols whose last store append failed
+
+    @classmethod
+    def shared(cls, server, timeframe=None):
+        """One cache per (server, timeframe) so accounts on the same broker reuse bars."""
+        timeframe = mt5.TIMEFRAME_M5 if timeframe is None else timeframe
+        key = (server, timeframe)
+        if key not in cls.SHARED:
+            store = BarStore(cls.STORE_DIR, server, timeframe) if cls.STORE_DIR else None
+            cls.SHARED[key] = cls(timeframe, store=store)
+        return cls.SHARED[key]
+
+    def _seed(self, symbol):
+        """Buffer filled with the newest stored bars (None if the store has none)."""
+        stored = self.store.read(symbol) if self.store else None
+        if stored is None:
+            return None
+        buf = self.buffers[symbol] = RingBuffer(stored.dtype, self.capacity)
+        buf.append(stored[-self.capacity:])
+        return buf
+
+    def update(self, symbol):
+        """Fetch bars newer than the cached tail. Returns False if the terminal gave nothing."""
+        buf = self.buffers.get(symbol)
+        if buf is None:
+            buf = self._seed(symbol)
+        start = self.start if buf is None else pd.Timestamp(buf.last_time(), unit="s", tz="UTC")
+
+        rates = mt5.copy_rates_range(symbol, self.timeframe, start, pd.Timestamp.now(tz="UTC"))
+        if rates is None:
+            return False
+        if buf is None:
+            buf = self.buffers[symbol] = RingBuffer(rates.dtype, self.capacity)
+
+        last = buf.last_time()
+        if buf.size and len(rates) and rates["time"][0] == last:
+            buf.replace_last(rates[0])
+        buf.append(rates[rates["time"] > last])
+
+        # Everything but the newest (possibly still forming) bar is final
+        if self.store is not None and len(rates) > 1:
+            # After a failed append, hand over the whole buffer so the store has no gap
+            rows = buf.view()[:-1] if symbol in self.unstored else rates[:-1]
+            try:
+                self.store.append(symbol, rows)
+                self.unstored.discard(symbol)
+            except OSError as e:
+                # Bars stay in the in-memory buffer; the store catches up on the next update
+                self.unstored.add(symbol)
+                log.warning(f"⚠️ Could not store bars for {symbol}: {e}")
+        return True
+
+    def bars(self, symbol):
+        """All cached bars for symbol (view, oldest first) or None if never fetched."""
+        buf = self.buffers.get(symbol)
+        return None if buf is None else buf.view()
+
+    def since(self, symbol, t):
+        """Cached bars with open time strictly after t (view)."""
+        bars = self.bars(symbol)
+        if bars is None:
+            return None
+        return bars[np.searchsorted(bars["time"], t, side="right"):]
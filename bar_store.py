@@ -0,0 +1,118 @@
+import json
+import os
+import re
+import time
+import numpy as np
+
+LOCK_STALE = 30     # seconds after which a leftover append lock is broken
+PUBLISH_RETRIES = 20    # index replace attempts (50 ms apart) while a reader has it open
+
+
+def _safe(name):
+    return re.sub(r"[^\w.-]", "_", str(name))
+
+
+class BarStore:
+    """
+    On-disk closed-bar history, one append-only file per (server, symbol, timeframe).
+
+    <dir>/<server>/<symbol>_<timeframe>.bars holds the raw MT5 rate rows and
+    the small JSON index next to it holds the dtype, row count and last bar
+    time. read() maps the file read-only (zero-copy), so any number of
+    account processes can share it. append() adds only rows newer than the
+    last stored bar under a short-lived lock file and publishes them by
+    replacing the index, so readers never see a partial row.
+    """
+
+    def __init__(self, directory, server, timeframe):
+        self.directory = os.path.join(directory, _safe(server))
+        self.timeframe = timeframe
+        self.stats = {"read_rows": 0, "appended_rows": 0}
+
+    def _path(self, symbol):
+        return os.path.join(self.directory, f"{_safe(symbol)}_{self.timeframe}")
+
+    def index(self, symbol):
+        """{"dtype", "count", "last"} for symbol, or None if nothing is stored."""
+        try:
+            with open(self._path(symbol) + ".json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def last_time(self, symbol):
+        idx = self.index(symbol)
+        return idx["last"] if idx else 0
+
+    def read(self, symbol):
+        """Stored bars as a read-only memmap (oldest first), or None."""
+        idx = self.index(symbol)
+        if not idx or not idx["count"]:
+            return None
+        dtype = np.dtype([tuple(field) for field in idx["dtype"]])
+        try:
+            bars = np.memmap(self._path(symbol) + ".bars", dtype=dtype, mode="r", shape=(idx["count"],))
+        except (OSError, ValueError):
+            return None
+        self.stats["read_rows"] += len(bars)
+        return bars
+
+    # -------------------- WRITING --------------------
+    def _lock(self, path):
+        lock = path + ".lock"
+        while True:
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return lock
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock) > LOCK_STALE:
+                        os.remove(lock)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(0.01)
+
+    @staticmethod
+    def _publish(tmp, index):
+        # Windows refuses the replace while another process is reading the index
+        for attempt in range(PUBLISH_RETRIES):
+            try:
+                os.replace(tmp, index)
+                return
+            except PermissionError:
+                if attempt == PUBLISH_RETRIES - 1:
+                    raise
+                time.sleep(0.05)
+
+    def append(self, symbol, rows):
+        """Append closed bars (time-ordered); rows not newer than the stored tail are skipped."""
+        if rows is None or not len(rows):
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(symbol)
+        lock = self._lock(path)
+        try:
+            idx = self.index(symbol)
+            if idx and [tuple(f) for f in idx["dtype"]] != rows.dtype.descr:
+                return 0
+            count = idx["count"] if idx else 0
+            new = rows[rows["time"] > (idx["last"] if idx else 0)]
+            if not len(new):
+                return 0
+            with open(path + ".bars", "r+b" if count else "wb") as f:
+                # Overwrite any unpublished tail from a crash; no truncate (not allowed on
+                # Windows while another process has the file mapped)
+                f.seek(count * rows.dtype.itemsize)
+                f.write(np.ascontiguousarray(new).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            tmp = path + ".json.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"dtype": rows.dtype.descr, "count": count + len(new),
+                           "last": int(new["time"][-1])}, f)
+            self._publish(tmp, path + ".json")
+            self.stats["appended_rows"] += len(new)
+            return len(new)
+        finally:
+            os.remove(lock)
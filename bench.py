@@ -0,0 +1,186 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from broker import use_backend
+from sim_broker import SimBroker, make_symbols
+from account import Account
+from bar_cache import BarCache
+from symbol_cache import SymbolMetaCache
+from session import TerminalSession
+from runner import STAGES
+from logs import setup_logging
+
+# Cycle-latency benchmark: runs the process_account stage sequence against
+# the simulated broker and reports per-stage wall time, MT5 call counts and
+# peak memory as JSON, so changes to Account can be compared to a baseline.
+#
+#   python bench.py --symbols 10,100,1000 --positions 0,30 --accounts 1,3 --out bench.json
+#   python bench.py --compare bench.json          # same sweep, ratios vs. saved run
+
+
+def _reset_shared_state():
+    """Fresh caches per scenario so runs do not warm each other up."""
+    Account.ACCOUNTS.clear()
+    TerminalSession.SHARED.clear()
+    BarCache.SHARED.clear()
+    BarCache.STORE_DIR = None   # no on-disk bars: every scenario starts cold
+    SymbolMetaCache.SHARED = SymbolMetaCache(path=None)
+
+
+def _setup(symbols, positions, accounts, latency, seed):
+    _reset_shared_state()
+    sim = use_backend(SimBroker(symbols=make_symbols(symbols), latency=latency, seed=seed,
+                                balance=10_000_000.0, leverage=500))
+    accs = [Account(f"Bench_{i}", 900000 + i, "bench", "Sim-Server") for i in range(accounts)]
+
+    # --- Pre-open positions on every account (not counted) ---
+    sim.initialize()
+    for acc in accs:
+        sim.login(acc.login, password=acc.password, server=acc.server)
+        for symbol in sim.symbols[:positions]:
+            sim.order_send({"action": sim.TRADE_ACTION_DEAL, "symbol": symbol, "volume": 0.01,
+                            "type": sim.ORDER_TYPE_BUY, "type_filling": sim.ORDER_FILLING_IOC})
+    sim.shutdown()
+    sim.reset_calls()
+    return sim, accs
+
+
+def _run(sim, accs, cycles, stats=None):
+    """Rotate through accounts like runner.main; fill stats with per-stage timings/calls."""
+    cycle_ms = {"cold": [], "warm": []}
+    connect_ms = []
+    for acc in accs:
+        t = time.perf_counter()
+        acc.connect()
+        connect_ms.append((time.perf_counter() - t) * 1000)
+        for cycle in range(cycles):
+            t_cycle = time.perf_counter()
+            for stage in STAGES:
+                before = Counter(sim.calls)
+                t = time.perf_counter()
+                getattr(acc, stage)()
+                if stats is not None:
+                    stats[stage]["wall_ms"] += (time.perf_counter() - t) * 1000
+                    stats[stage]["mt5_calls"].update(sim.calls - before)
+            cycle_ms["cold" if cycle == 0 else "warm"].append((time.perf_counter() - t_cycle) * 1000)
+        acc.connected = False
+    return cycle_ms, connect_ms
+
+
+def _summary(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "mean": round(statistics.fmean(values), 3),
+        "p50": round(values[len(values) // 2], 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def run_scenario(symbols, positions, accounts, cycles=5, latency=0.0, seed=0, memory=True):
+    stats = {stage: {"wall_ms": 0.0, "mt5_calls": Counter()} for stage in STAGES}
+    sim, accs = _setup(symbols, positions, accounts, latency, seed)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        cycle_ms, connect_ms = _run(sim, accs, cycles, stats)
+    total_calls = sum(sim.calls.values())
+
+    peak_kb = None
+    if memory:
+        # Separate traced replay: tracemalloc would distort the timings above
+        sim, accs = _setup(symbols, positions, accounts, latency, seed)
+        tracemalloc.start()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            _run(sim, accs, cycles)
+        peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    n_cycles = cycles * accounts
+    return {
+        "scenario": {"symbols": symbols, "positions": positions, "accounts": accounts,
+                     "cycles": cycles, "latency_s": latency, "seed": seed},
+        "cycle_ms": {"cold": _summary(cycle_ms["cold"]), "warm": _summary(cycle_ms["warm"])},
+        "connect_ms": _summary(connect_ms),
+        "mt5_calls_total": total_calls,
+        "mt5_calls_per_cycle": round(total_calls / n_cycles, 1),
+        "peak_mem_kb": peak_kb,
+        "stages": {
+            stage: {
+                "wall_ms": round(s["wall_ms"], 3),
+                "wall_ms_per_cycle": round(s["wall_ms"] / n_cycles, 3),
+                "mt5_calls": dict(s["mt5_calls"]),
+                "mt5_calls_per_cycle": round(sum(s["mt5_calls"].values()) / n_cycles, 1),
+            }
+            for stage, s in stats.items()
+        },
+    }
+
+
+def compare(results, baseline):
+    """Print per-stage time/call ratios (current / baseline) for matching scenarios."""
+    base = {json.dumps(r["scenario"], sort_keys=True): r for r in baseline}
+    for r in results:
+        b = base.get(json.dumps(r["scenario"], sort_keys=True))
+        if b is None:
+            continue
+        sc = r["scenario"]
+        print(f"\n📊 symbols={sc['symbols']} positions={sc['positions']} accounts={sc['accounts']}", file=sys.stderr)
+        for stage, s in r["stages"].items():
+            bs = b["stages"].get(stage)
+            if not bs:
+                continue
+            t_ratio = s["wall_ms"] / bs["wall_ms"] if bs["wall_ms"] else float("nan")
+            c_ratio = (s["mt5_calls_per_cycle"] / bs["mt5_calls_per_cycle"]
+                       if bs["mt5_calls_per_cycle"] else float("nan"))
+            print(f"   {stage:<28} time x{t_ratio:6.2f} | mt5 calls x{c_ratio:6.2f}", file=sys.stderr)
+
+
+def _ints(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main(argv=None):
+    setup_logging(console=False, path=None)     # keep stdout for the JSON results
+    parser = argparse.ArgumentParser(description="Benchmark the runner stage sequence against SimBroker.")
+    parser.add_argument("--symbols", type=_ints, default=[10, 100, 1000])
+    parser.add_argument("--positions", type=_ints, default=[0, 30])
+    parser.add_argument("--accounts", type=_ints, default=[1, 3])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every MT5 call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--out", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --out run")
+    args = parser.parse_args(argv)
+
+    results = []
+    for symbols, positions, accounts in itertools.product(args.symbols, args.positions, args.accounts):
+        if positions > symbols:
+            continue
+        print(f"⏱ symbols={symbols} positions={positions} accounts={accounts} ...", file=sys.stderr)
+        results.append(run_scenario(symbols, positions, accounts, args.cycles,
+                                    args.latency, args.seed, memory=not args.no_memory))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == "__main__":
+    main()
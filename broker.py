@@ -0,0 +1,37 @@
+import os
+
+
+class BrokerProxy:
+    """
+    Stand-in for ``import MetaTrader5 as mt5`` that forwards to a pluggable backend.
+
+    By default the real MetaTrader5 package is imported on first use, so
+    nothing changes on a Windows box with a terminal. use() swaps in any
+    object with the same API (e.g. sim_broker.SimBroker) for offline runs,
+    benchmarks and tests. Setting MT5_BACKEND=sim does the same at startup.
+    """
+
+    def __init__(self):
+        self.backend = None
+
+    def use(self, backend):
+        self.backend = backend
+        return backend
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            if os.environ.get("MT5_BACKEND", "").lower() == "sim":
+                from sim_broker import SimBroker
+                self.backend = SimBroker()
+            else:
+                import MetaTrader5
+                self.backend = MetaTrader5
+        return getattr(self.backend, name)
+
+
+mt5 = BrokerProxy()
+
+
+def use_backend(backend):
+    """Route every mt5.* call in the bot to backend (returns it)."""
+    return mt5.use(backend)
@@ -2,6 +2,9 @@
 # ------------------ EMA SETTINGS ------------------
 FAST = 8       # EMA fast period
 SLOW = 21      # EMA slow period
+HISTORY_START = "2025-09-21"   # First M5 bar (UTC) used to seed the EMAs
+BAR_CACHE_SIZE = 5000          # M5 bars kept in memory per symbol (~17 days)
+BAR_STORE_DIR = "bars"         # On-disk closed-bar history shared by all processes (None = off)
 
 # ------------------ FIXED DISTANCES ------------------
 FIX_MARGIN_REAL = 360     # Real TP/SL distance in pips
@@ -21,10 +24,32 @@ VOL_ST = 0.01       # Default lot size
 
 # ------------------ TIME SETTINGS ------------------
 MONITOR_INTERVAL = 3      # Seconds between virtual order checks
-SAVE_INTERVAL = 60        # Seconds between saving account state
+SAVE_INTERVAL = 60        # Seconds between compacted account state snapshots
+JOURNAL_FSYNC = 1.0       # Seconds between fsyncs of the account state journal
+JOURNAL_DIR = "state"     # Per-account state journals/snapshots
+SIGNAL_FLIP_DELAY = 9 * 60  # Seconds before re-entering after a signal-flip close
+SESSION_HEARTBEAT = 30    # Seconds between terminal liveness checks (terminal_info)
+CONFIRM_TIMEOUT = 30      # Seconds to wait for a sent order to show up in (or leave) positions
+
+# ------------------ LOGGING ------------------
+LOG_LEVEL = "INFO"                # DEBUG adds the per-order monitor lines
+LOG_FILE = "logs/mt5_bot.jsonl"   # Structured (JSON lines) log, rotated; None = console only
+LOG_DEDUP_WINDOW = 60             # Seconds an identical report line is suppressed after it was logged
+
+# ------------------ SYMBOL METADATA CACHE ------------------
+SYMBOL_META_TTL = 3600                # Seconds before static symbol fields are refetched
+SYMBOL_META_FILE = "symbol_meta.json" # Disk copy for warm restarts (None = memory only)
+
+# ------------------ MARGIN TABLE ------------------
+MARGIN_TTL = 3600         # Seconds before a cached margin requirement is recalculated
+MARGIN_MOVE = 0.005       # Relative price move that forces a recalculation
+MARGIN_BAND = 0.05        # Estimates this close to the free-margin limit are checked live
 
 # ------------------ EXOTIC PAIRS ------------------
-# EXOTIC_PAIRS = {"USDZAR", "USDMXN", "USDSEK", "USDNOK"}
+EXOTIC_PAIRS = {          # Per account currency; TP/SL distance is widened for these
+    "USD": {"USDZAR", "USDMXN", "USDSEK", "USDNOK"},
+    "EUR": {"EURDKK", "EURHKD", "EURSGD", "EURTRY"},
+}
 
 # ------------------ MISC ------------------
 VOL_MULT_FACTOR = 40      # Factor to adjust distance for exotic pairs
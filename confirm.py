@@ -0,0 +1,80 @@
+import time
+from config import CONFIRM_TIMEOUT
+
+
+class ConfirmationTracker:
+    """
+    Sent orders waiting to show up in (or disappear from) the position list.
+
+    Instead of sleeping and polling positions_get() right after order_send,
+    the caller records what it expects and carries on; resolve() checks
+    every outstanding confirmation against one positions list on a later
+    cycle. An opened position is found by the order ticket from the
+    order_send result (MT5 uses the opening order ticket as the position
+    ticket), falling back to an unlinked position with the same symbol and
+    volume. Anything not confirmed within CONFIRM_TIMEOUT seconds is dropped
+    and reported.
+    """
+
+    def __init__(self, timeout=CONFIRM_TIMEOUT):
+        self.timeout = timeout
+        self.opens = {}     # id(vo) -> (vo, expected position ticket, sent at)
+        self.closes = {}    # position ticket -> (symbol, sent at)
+        self.stats = {"confirmed": 0, "relinked": 0, "timed_out": 0}
+
+    def __len__(self):
+        return len(self.opens) + len(self.closes)
+
+    def expect_open(self, vo, ticket):
+        self.opens[id(vo)] = (vo, ticket or None, time.time())
+
+    def expect_close(self, ticket, symbol):
+        self.closes[ticket] = (symbol, time.time())
+
+    def resolve(self, positions, linked_tickets=()):
+        """
+        Match outstanding confirmations against positions.
+
+        linked_tickets: position tickets already owned by other orders (never
+        used for the symbol/volume fallback).
+        Returns (opened, closed, expired):
+          opened  [(vo, position)]      position found for a sent open
+          closed  [(symbol, ticket)]    position gone after a sent close
+          expired [(kind, symbol, ticket)]  not confirmed in time ("open"/"close")
+        """
+        now = time.time()
+        by_ticket = {p.ticket: p for p in positions}
+        taken = set(linked_tickets) | self.closes.keys()
+        opened, closed, expired = [], [], []
+
+        for key, (vo, ticket, sent) in list(self.opens.items()):
+            pos = by_ticket.get(ticket)
+            if pos is None:
+                pos = next((p for p in positions
+                            if p.symbol == vo.symbol and abs(p.volume - vo.volume) < 1e-6
+                            and p.ticket not in taken), None)
+                if pos is not None:
+                    self.stats["relinked"] += 1
+            if pos is not None:
+                taken.add(pos.ticket)
+                opened.append((vo, pos))
+                self.stats["confirmed"] += 1
+            elif now - sent > self.timeout:
+                expired.append(("open", vo.symbol, ticket))
+                self.stats["timed_out"] += 1
+            else:
+                continue
+            del self.opens[key]
+
+        for ticket, (symbol, sent) in list(self.closes.items()):
+            if ticket not in by_ticket:
+                closed.append((symbol, ticket))
+                self.stats["confirmed"] += 1
+            elif now - sent > self.timeout:
+                expired.append(("close", symbol, ticket))
+                self.stats["timed_out"] += 1
+            else:
+                continue
+            del self.closes[ticket]
+
+        return opened, closed, expired
@@ -0,0 +1,173 @@
+import time
+from collections import deque
+import numpy as np
+from broker import mt5
+from config import MARGIN_TTL, MARGIN_MOVE, MARGIN_BAND
+
+SAFETY_BUFFER = 50.0    # EUR/USD equivalent kept above the stop-out equity
+
+
+class MarginBudget:
+    """
+    Free margin and stop-out headroom tracked locally from one account_info().
+
+    admit() commits an order's required margin against the budget without
+    asking the terminal again, so a whole batch of pending orders can be
+    screened from a single account snapshot.
+    """
+
+    def __init__(self, info, safety_buffer=SAFETY_BUFFER):
+        self.equity = info.equity
+        self.margin = info.margin
+        self.free = info.margin_free
+        self.so_mode = getattr(info, "margin_so_mode", 0)
+        self.so_level = getattr(info, "margin_so_so", 0.0)    # stop-out level (% or money)
+        self.safety_buffer = safety_buffer
+
+    def min_equity(self, margin=None):
+        """Equity needed to stay safety_buffer above stop-out with the given used margin."""
+        margin = self.margin if margin is None else margin
+        if self.so_mode == 0:   # percent-based
+            return margin * (self.so_level / 100.0) + self.safety_buffer
+        return self.so_level + self.safety_buffer
+
+    def healthy(self):
+        return self.equity > self.min_equity()
+
+    def fits(self, required):
+        return self.free >= required and self.equity > self.min_equity(self.margin + required)
+
+    def admit(self, required):
+        """Reserve required margin if it fits; False leaves the budget unchanged."""
+        if not self.fits(required):
+            return False
+        self.margin += required
+        self.free -= required
+        return True
+
+
+class MarginTable:
+    """
+    Memoized order_calc_margin() results keyed by (symbol, lot bucket).
+
+    Each entry keeps the price it was calculated at; between recalculations
+    the requirement is scaled by the price ratio. An entry is recalculated
+    by refresh() when it is older than MARGIN_TTL (leverage or contract
+    changes) or the price moved more than MARGIN_MOVE since. admit() takes
+    the estimate when it is clearly inside or outside the budget and only
+    asks the terminal for borderline cases (within MARGIN_BAND).
+    """
+
+    def __init__(self, ttl=MARGIN_TTL, move=MARGIN_MOVE, band=MARGIN_BAND):
+        self.ttl = ttl
+        self.move = move
+        self.band = band
+        self.rows = {}      # (symbol, bucket) -> (margin, price, calculated at)
+        self.stats = {"estimated": 0, "live": 0}
+
+    @staticmethod
+    def bucket(lot):
+        return round(lot, 2)
+
+    @staticmethod
+    def _price(market, symbol):
+        tick = market.symbol_info_tick(symbol)
+        return tick.ask if tick else None
+
+    def live(self, symbol, lot, price):
+        """order_calc_margin() at price (margin is the same for buy/sell); stores the result."""
+        self.stats["live"] += 1
+        margin = mt5.order_calc_margin(mt5.ORDER_TYPE_BUY, symbol, lot, price)
+        if margin is not None:
+            self.rows[(symbol, self.bucket(lot))] = (margin, price, time.time())
+        return margin
+
+    def fresh(self, symbol, lot, price, now=None):
+        row = self.rows.get((symbol, self.bucket(lot)))
+        if row is None or not row[1]:
+            return False
+        now = time.time() if now is None else now
+        return now - row[2] < self.ttl and abs(price / row[1] - 1.0) <= self.move
+
+    def refresh(self, items, market):
+        """Recalculate every stale (symbol, lot) in items; one terminal call per stale entry."""
+        now = time.time()
+        for symbol, lot in dict.fromkeys((s, self.bucket(l)) for s, l in items):
+            price = self._price(market, symbol)
+            if price and not self.fresh(symbol, lot, price, now):
+                self.live(symbol, lot, price)
+
+    def screen(self, items, market):
+        """Estimated margin for every (symbol, lot) in items as one array (NaN if unknown)."""
+        items = list(items)
+        self.refresh(items, market)
+        rows = [self.rows.get((s, self.bucket(l))) for s, l in items]
+        base = np.array([r[0] if r else np.nan for r in rows], dtype=float)
+        at = np.array([r[1] if r else np.nan for r in rows], dtype=float)
+        price = np.array([self._price(market, s) or np.nan for s, _ in items], dtype=float)
+        lots = np.array([l for _, l in items], dtype=float)
+        buckets = np.array([self.bucket(l) for _, l in items], dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            est = base * (price / at) * (lots / buckets)
+        self.stats["estimated"] += int(np.count_nonzero(~np.isnan(est)))
+        return est
+
+    def required(self, symbol, lot, market):
+        """Margin for one order from the table (refreshed if stale)."""
+        est = self.screen([(symbol, lot)], market)[0]
+        return None if np.isnan(est) else float(est)
+
+    def admit(self, budget, symbol, lot, estimate, market):
+        """
+        Commit the order's margin against budget; return the amount, or None if it does not fit.
+        Clear cases use the estimate, borderline ones the live requirement.
+        """
+        estimate = float(estimate)
+        if not np.isnan(estimate):
+            if budget.fits(estimate * (1.0 + self.band)):
+                return estimate if budget.admit(estimate) else None
+            if not budget.fits(estimate * (1.0 - self.band)):
+                return None
+        price = self._price(market, symbol)
+        required = self.live(symbol, lot, price) if price else None
+        if required is None or not budget.admit(required):
+            return None
+        return required
+
+
+class FillLog:
+    """Per-order send latency and slippage (points, positive = against us) of recent fills."""
+
+    def __init__(self, maxlen=500):
+        self.fills = deque(maxlen=maxlen)
+
+    def record(self, symbol, order_type, requested, result, ms, point):
+        requested = float(requested)
+        filled = float(getattr(result, "price", 0.0) or requested)
+        slip = (filled - requested) if order_type == mt5.ORDER_TYPE_BUY else (requested - filled)
+        fill = {
+            "time": time.time(),
+            "symbol": symbol,
+            "ms": round(ms, 1),
+            "requested": requested,
+            "filled": filled,
+            "slippage": round(slip / float(point), 1) if point else 0.0,
+            "retcode": getattr(result, "retcode", None),
+        }
+        self.fills.append(fill)
+        return fill
+
+    def summary(self, last=None):
+        """{count, mean_ms, max_ms, mean_slippage, max_slippage} over the last `last` fills."""
+        fills = list(self.fills)[-last:] if last else list(self.fills)
+        if not fills:
+            return {"count": 0}
+        ms = [f["ms"] for f in fills]
+        slip = [f["slippage"] for f in fills]
+        return {
+            "count": len(fills),
+            "mean_ms": round(sum(ms) / len(ms), 1),
+            "max_ms": max(ms),
+            "mean_slippage": round(sum(slip) / len(slip), 1),
+            "max_slippage": max(slip),
+        }
@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from broker import mt5
+from config import SAVE_INTERVAL, JOURNAL_DIR, JOURNAL_FSYNC
+from order_book import OrderBook
+from virtual_order import VirtualOrder
+
+BOOKS = ("open_orders", "pending_orders", "delay_orders")
+LISTS = ("ban_swap", "ban_positions")
+
+# Changes every tick and is recomputed by the monitor, so it is not journaled
+VOLATILE = ("profit", "profit_pips")
+
+
+def _json_default(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _plain(value):
+    """value as it reads back from JSON (lists, floats, ints), so diffs compare like with like."""
+    return json.loads(json.dumps(value, default=_json_default))
+
+
+def _order_record(vo):
+    d = vo.as_dict()
+    for name in VOLATILE:
+        d.pop(name, None)
+    return _plain(d)
+
+
+class StateJournal:
+    """
+    Append-only journal of one account's order state with periodic snapshots.
+
+    record() diffs the account's books and ban lists against what was last
+    written and appends one JSON line per change ({"book", "symbol", "order"}
+    with order None for a removal, or {"list", "value"}). Lines are flushed
+    right away but fsynced at most every JOURNAL_FSYNC seconds. Every
+    SAVE_INTERVAL seconds compact() writes the full state to the snapshot
+    file (atomic replace) and truncates the journal.
+
+    replay() rebuilds the state as snapshot + journal lines; a torn last
+    line from a crash mid-write is ignored and truncated away.
+    """
+
+    def __init__(self, path, fsync_every=JOURNAL_FSYNC, compact_every=SAVE_INTERVAL):
+        self.path = path
+        self.snapshot_path = f"{path}.snap"
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self.state = {"books": {b: {} for b in BOOKS}, "lists": {name: None for name in LISTS}}
+        self.file = None
+        self.last_sync = time.time()
+        self.last_compact = time.time()
+        self.dirty = False
+        self.stats = {"records": 0, "replayed": 0, "compactions": 0}
+
+    @classmethod
+    def for_account(cls, acc, directory=JOURNAL_DIR):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{acc.login}_{acc.server}".replace(os.sep, "_")
+        return cls(os.path.join(directory, f"{name}.journal"))
+
+    # -------------------- RECOVERY --------------------
+    def _apply(self, rec):
+        if "book" in rec:
+            book = self.state["books"][rec["book"]]
+            if rec["order"] is None:
+                book.pop(rec["symbol"], None)
+            else:
+                book[rec["symbol"]] = rec["order"]
+        elif "list" in rec:
+            self.state["lists"][rec["list"]] = rec["value"]
+
+    def replay(self):
+        """Load snapshot + journal into self.state; returns the number of journal lines applied."""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self.state["books"].update(snap.get("books", {}))
+            self.state["lists"].update(snap.get("lists", {}))
+        except (OSError, ValueError):
+            pass
+
+        applied = 0
+        good = 0        # byte offset just past the last complete line
+        torn = False
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        rec = json.loads(line)
+                    except ValueError:
+                        torn = True     # torn tail after a crash
+                        break
+                    self._apply(rec)
+                    applied += 1
+                    good += len(line)
+        except OSError:
+            pass
+        if torn:
+            # Cut the fragment off so the next record does not get glued onto it
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+        self.stats["replayed"] += applied
+        return applied
+
+    def restore(self, acc):
+        """Put the replayed books and ban lists on acc."""
+        for name in BOOKS:
+            orders = [VirtualOrder.from_dict(d) for d in self.state["books"][name].values()]
+            setattr(acc, name, OrderBook(orders))
+        if self.state["lists"]["ban_swap"] is not None:
+            acc.ban_swap = list(self.state["lists"]["ban_swap"])
+        if self.state["lists"]["ban_positions"] is not None:
+            acc.ban_positions = dict(self.state["lists"]["ban_positions"])
+
+    # -------------------- RECORDING --------------------
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        return self.file
+
+    def _write(self, rec):
+        self._open().write(json.dumps(rec) + "\n")
+        self._apply(rec)
+        self.stats["records"] += 1
+        self.dirty = True
+
+    def record(self, acc):
+        """Append every change since the last call; returns how many lines were written."""
+        before = self.stats["records"]
+        for name in BOOKS:
+            written = self.state["books"][name]
+            current = {vo.symbol: _order_record(vo) for vo in getattr(acc, name)}
+            for symbol, order in current.items():
+                if written.get(symbol) != order:
+                    self._write({"book": name, "symbol": symbol, "order": order})
+            for symbol in [s for s in written if s not in current]:
+                self._write({"book": name, "symbol": symbol, "order": None})
+
+        for name in LISTS:
+            value = _plain(getattr(acc, name))
+            if self.state["lists"][name] != value:
+                self._write({"list": name, "value": value})
+
+        if self.file is not None:
+            self.file.flush()
+        now = time.time()
+        if self.dirty and now - self.last_sync >= self.fsync_every:
+            self.sync()
+        if now - self.last_compact >= self.compact_every:
+            self.compact()
+        return self.stats["records"] - before
+
+    def sync(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.dirty = False
+        self.last_sync = time.time()
+
+    def compact(self):
+        """Write the full state as the new snapshot and start an empty journal."""
+        tmp = f"{self.snapshot_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        open(self.path, "w").close()
+        self.dirty = False
+        self.last_compact = time.time()
+        self.stats["compactions"] += 1
+
+    def close(self):
+        self.sync()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# -------------------- ACCOUNT HELPERS --------------------
+def load_account_state(acc):
+    """
+    Restore acc's books and ban lists from its journal (once per process).
+
+    Open orders linked to a position that no longer exists (closed while the
+    bot was down) are dropped; collect_positions adopts any unknown ones.
+    """
+    if getattr(acc, "journal", None) is not None:
+        return acc.journal      # state in memory is already current
+    t = time.perf_counter()
+    journal = acc.journal = StateJournal.for_account(acc)
+    lines = journal.replay()
+    journal.restore(acc)
+
+    if acc.connected:
+        positions = mt5.positions_get()
+        if positions is not None:
+            live = {p.ticket for p in positions}
+            for vo in list(acc.open_orders):
+                if vo.linked_real_order is not None and vo.linked_real_order not in live:
+                    acc.open_orders.discard(vo)
+
+    acc.log.info(f"💾 Restored state in {(time.perf_counter() - t) * 1000:.1f} ms "
+                 f"({lines} journal lines) — open {len(acc.open_orders)}, pending {len(acc.pending_orders)}, "
+                 f"delay {len(acc.delay_orders)}, bans {len(acc.ban_swap)}/{len(acc.ban_positions)}")
+    journal.record(acc)
+    return journal
+
+
+def save_account_state(acc, close=False):
+    """Journal acc's changes since the last save (close=True also fsyncs and closes the file)."""
+    journal = getattr(acc, "journal", None)
+    if journal is None:
+        # Never loaded: diff against what is on disk, keep the in-memory state
+        journal = acc.journal = StateJournal.for_account(acc)
+        journal.replay()
+    journal.record(acc)
+    if close:
+        journal.close()
@@ -0,0 +1,58 @@
+from broker import mt5
+
+
+class AccountLedger:
+    """
+    Cached account_info() for one login.
+
+    Refreshed once per cycle (Account.begin_cycle). Between refreshes every
+    open and close the bot makes is applied locally: reserve() adds a fill's
+    margin and release() gives a closed position's margin back, so reads in
+    the middle of a cycle never go back to the terminal. An unknown amount
+    (None) makes the next read refresh instead.
+    """
+
+    def __init__(self):
+        self.raw = None         # last mt5.account_info() result
+        self.stale = True
+        self.reserved = 0.0     # margin committed locally since the last refresh
+        self.refreshes = 0
+
+    def refresh(self):
+        self.raw = mt5.account_info()
+        self.stale = self.raw is None
+        self.reserved = 0.0
+        self.refreshes += 1
+        return self.raw
+
+    def reserve(self, amount):
+        """A position was opened with `amount` margin."""
+        if amount is None:
+            self.stale = True
+        else:
+            self.reserved += amount
+
+    def release(self, amount):
+        """A position holding `amount` margin was closed."""
+        if amount is None:
+            self.stale = True
+        else:
+            self.reserved -= amount
+
+    def account_info(self):
+        """account_info() namedtuple with the local margin ledger applied."""
+        if self.stale:
+            self.refresh()
+        if self.raw is None or not self.reserved:
+            return self.raw
+        return self.raw._replace(
+            margin=self.raw.margin + self.reserved,
+            margin_free=self.raw.margin_free - self.reserved,
+        )
+
+    @property
+    def currency(self):
+        # Currency never changes for a login, so it never forces a refresh
+        if self.raw is None:
+            self.refresh()
+        return self.raw.currency.upper() if self.raw else "USD"
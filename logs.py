@@ -0,0 +1,135 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from config import LOG_LEVEL, LOG_FILE, LOG_DEDUP_WINDOW
+
+ROOT = "mt5"
+REPORT = f"{ROOT}.report"   # diagnostic reports; the only records that are de-duplicated
+CONSOLE_FORMAT = "%(asctime)s %(levelname)-7s %(account)s: %(message)s"
+
+_listener = None
+_dedup = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, account, msg plus any extra={"data": {...}}."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "account": getattr(record, "account", None),
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "data", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable line; records without an account show their logger's short name instead."""
+
+    def __init__(self):
+        super().__init__(CONSOLE_FORMAT, "%H:%M:%S")
+
+    def format(self, record):
+        if getattr(record, "account", None) is None:
+            record.account = record.name.rsplit(".", 1)[-1]
+        return super().format(record)
+
+
+class AccountLogger(logging.LoggerAdapter):
+    """Adds the account name to every record and keeps per-call extra= fields."""
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+
+class DedupFilter(logging.Filter):
+    """
+    Drops a report record (REPORT logger) identical (account, level, message)
+    to one let through less than `window` seconds ago. Trade and order logs
+    and errors always pass.
+    """
+
+    def __init__(self, window=LOG_DEDUP_WINDOW):
+        super().__init__()
+        self.window = window
+        self.seen = {}
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.name != REPORT or record.levelno >= logging.ERROR or not self.window:
+            return True
+        key = (record.name, getattr(record, "account", None), record.levelno, record.getMessage())
+        last = self.seen.get(key)
+        if last is not None and record.created - last < self.window:
+            self.dropped += 1
+            return False
+        self.seen[key] = record.created
+        if len(self.seen) > 10_000:
+            cutoff = record.created - self.window
+            self.seen = {k: t for k, t in self.seen.items() if t >= cutoff}
+        return True
+
+
+def setup_logging(level=LOG_LEVEL, path=LOG_FILE, console=True, dedup_window=LOG_DEDUP_WINDOW):
+    """
+    Route the "mt5" loggers through a queue to a background writer thread.
+
+    The trading thread only formats the message and puts it on the queue;
+    console (human readable) and file (JSON lines, rotated) output happen on
+    the listener thread. Repeated identical report messages are suppressed
+    for dedup_window seconds. Safe to call more than once (first call wins).
+    """
+    global _listener, _dedup
+    if _listener is not None:
+        return
+    handlers = []
+    if console:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(ConsoleFormatter())
+        handlers.append(stream)
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        file = logging.handlers.RotatingFileHandler(path, maxBytes=10_000_000, backupCount=5, encoding="utf-8")
+        file.setFormatter(JsonFormatter())
+        handlers.append(file)
+
+    _dedup = DedupFilter(dedup_window)
+    handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    handler.addFilter(_dedup)
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.handlers[:] = [handler]
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush the queue and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped():
+    """Number of duplicate messages suppressed so far."""
+    return _dedup.dropped if _dedup else 0
+
+
+def get_logger(name=None, account=None):
+    """Logger under "mt5"; account tags every record. Output starts once setup_logging() ran."""
+    logger = logging.getLogger(f"{ROOT}.{name}" if name else ROOT)
+    return AccountLogger(logger, {"account": account}) if account else logger
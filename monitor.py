@@ -0,0 +1,105 @@
+import numpy as np
+from broker import mt5
+from profit import ProfitCalculator
+
+
+class ChangeGate:
+    """
+    Remembers the last stamp seen per key so unchanged keys can be skipped.
+
+    changed() is True the first time a key is seen and whenever its stamp
+    differs from the stored one; stats counts evaluated vs skipped keys.
+    """
+
+    def __init__(self):
+        self.seen = {}
+        self.stats = {"evaluated": 0, "skipped": 0}
+
+    def changed(self, key, stamp):
+        if stamp is not None and self.seen.get(key) == stamp:
+            self.stats["skipped"] += 1
+            return False
+        self.seen[key] = stamp
+        self.stats["evaluated"] += 1
+        return True
+
+    def forget(self, key):
+        """Evaluate key again on the next call (e.g. after a failed action)."""
+        self.seen.pop(key, None)
+
+    def prune(self, keys):
+        """Drop stamps for keys that no longer exist."""
+        keys = set(keys)
+        self.seen = {k: v for k, v in self.seen.items() if k in keys}
+
+
+class BatchMonitor:
+    """
+    Virtual TP/SL and P/L evaluation for all open orders in one vectorized step.
+
+    Entry, virtual TP/SL, direction and volume of the open OrderBook are kept
+    in NumPy arrays and only rebuilt when the book changes. evaluate() runs
+    the same rules as the per-order loop against one bid/ask array taken
+    from the cycle's MarketSnapshot; P/L comes from the ProfitCalculator.
+
+    Orders whose symbol has no new tick (same time_msc) since they were
+    last evaluated are skipped; gate.stats counts evaluated vs skipped.
+    """
+
+    def __init__(self, profits=None):
+        self.profits = profits or ProfitCalculator()
+        self.version = None
+        self.orders = []
+        self.symbols = []
+        self.entry = np.empty(0)
+        self.virt_tp = np.empty(0)
+        self.virt_sl = np.empty(0)
+        self.volume = np.empty(0)
+        self.is_buy = np.empty(0, dtype=bool)        # signal == "buy"
+        self.prices_ask = np.empty(0, dtype=bool)    # type == ORDER_TYPE_BUY
+        self.pip = np.empty(0)
+        self.gate = ChangeGate()    # order -> time_msc of its last evaluated tick
+
+    def sync(self, book):
+        """Rebuild the arrays if the OrderBook changed since the last call."""
+        if book.version == self.version:
+            return
+        self.version = book.version
+        self.orders = list(book)
+        self.symbols = [vo.symbol for vo in self.orders]
+
+        def col(attr):
+            return np.array([np.nan if getattr(vo, attr) is None else getattr(vo, attr)
+                             for vo in self.orders], dtype=float)
+
+        self.entry = col("entry_price")
+        self.virt_tp = col("virtual_tp")
+        self.virt_sl = col("virtual_sl")
+        self.volume = col("volume")
+        self.is_buy = np.array([vo.signal == "buy" for vo in self.orders], dtype=bool)
+        self.prices_ask = np.array([vo.type == mt5.ORDER_TYPE_BUY for vo in self.orders], dtype=bool)
+        self.pip = np.array([0.01 if "JPY" in s else 0.0001 for s in self.symbols])
+        self.gate.prune(self.orders)
+
+    def evaluate(self, market, account_currency="USD"):
+        """
+        Returns (valid, hit_tp, hit_sl, profit_pips, profit) arrays aligned with self.orders.
+        valid is False where the symbol has no tick, no symbol info, or no new
+        tick since the order was last evaluated.
+        """
+        bid, ask = market.quotes(self.symbols)
+        valid = ~np.isnan(bid) & np.array([market.symbol_info(s) is not None for s in self.symbols], dtype=bool)
+        for i in np.flatnonzero(valid):
+            tick = market.symbol_info_tick(self.symbols[i])
+            valid[i] = self.gate.changed(self.orders[i], tick.time_msc)
+
+        # --- TP / SL hits (price side follows order type, direction follows signal) ---
+        price = np.where(self.prices_ask, ask, bid)
+        hit_tp = valid & np.where(self.is_buy, price > self.virt_tp, price < self.virt_tp)
+        hit_sl = valid & np.where(self.is_buy, price < self.virt_sl, price > self.virt_sl)
+
+        # --- Virtual profit for all orders ---
+        profit_pips, profit = self.profits.profit_arrays(
+            self.is_buy, self.entry, self.volume, self.pip, bid, ask, market, account_currency)
+
+        return valid, hit_tp, hit_sl, profit_pips, profit
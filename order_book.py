@@ -0,0 +1,96 @@
+class OrderBook:
+    """
+    Orders indexed by symbol (one order per symbol) and by ticket.
+
+    Both the order's own ticket and its linked real position ticket are
+    indexed, so insert / lookup / remove are O(1) whichever id the caller
+    has. symbols() is a live set-like view for open/pending/delay comparisons.
+    version changes on every mutation so derived views know when to rebuild.
+    """
+
+    def __init__(self, orders=()):
+        self.by_symbol = {}
+        self.tickets = {}     # ticket or linked_real_order -> symbol
+        self.version = 0
+        for order in orders:
+            self.add(order)
+
+    def __len__(self):
+        return len(self.by_symbol)
+
+    def __iter__(self):
+        # Iterate over a copy so callers may add/remove while looping
+        return iter(list(self.by_symbol.values()))
+
+    def __contains__(self, symbol):
+        return symbol in self.by_symbol
+
+    def symbols(self):
+        return self.by_symbol.keys()
+
+    # -------------------- LOOKUPS --------------------
+    def get(self, symbol, default=None):
+        return self.by_symbol.get(symbol, default)
+
+    def find_ticket(self, ticket):
+        symbol = self.tickets.get(ticket)
+        return None if symbol is None else self.by_symbol.get(symbol)
+
+    def only_in(self, other):
+        """Orders whose symbol is not in the other book."""
+        return [o for s, o in self.by_symbol.items() if s not in other.by_symbol]
+
+    def common(self, other):
+        """Symbols present in both books."""
+        return self.by_symbol.keys() & other.by_symbol.keys()
+
+    # -------------------- MUTATION --------------------
+    def _ids(self, order):
+        return [t for t in (order.ticket, order.linked_real_order) if t is not None]
+
+    def add(self, order):
+        """Insert order; replaces any order already stored for the same symbol."""
+        symbol = order.symbol
+        self.remove(symbol)
+        self.by_symbol[symbol] = order
+        self.version += 1
+        for ticket in self._ids(order):
+            self.tickets[ticket] = symbol
+
+    def link(self, order, ticket):
+        """Attach a real position ticket to a stored order and index it (drops the old link)."""
+        stored = self.by_symbol.get(order.symbol) is order
+        old = order.linked_real_order
+        if stored and old is not None and old != order.ticket and self.tickets.get(old) == order.symbol:
+            del self.tickets[old]
+        order.linked_real_order = ticket
+        self.version += 1
+        if stored:
+            self.tickets[ticket] = order.symbol
+
+    def remove(self, symbol):
+        """Remove and return the order for symbol (None if absent)."""
+        order = self.by_symbol.pop(symbol, None)
+        if order is not None:
+            self.version += 1
+            for ticket in self._ids(order):
+                if self.tickets.get(ticket) == symbol:
+                    del self.tickets[ticket]
+        return order
+
+    def discard(self, order):
+        """Remove order if it is the one stored for its symbol."""
+        if self.by_symbol.get(order.symbol) is order:
+            self.remove(order.symbol)
+
+    def remove_position(self, symbol, ticket=None):
+        """Remove orders for symbol and any order linked to ticket; return what was removed."""
+        removed = [self.remove(symbol)]
+        if ticket is not None and ticket in self.tickets:
+            removed.append(self.remove(self.tickets[ticket]))
+        return [o for o in removed if o is not None]
+
+    def clear(self):
+        self.by_symbol.clear()
+        self.tickets.clear()
+        self.version += 1
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class ProfitCalculator:
+    """
+    Virtual P/L for many orders against one quote snapshot.
+
+    Uses the same approximation as Account.calc_virtual_profit ($10 per pip
+    per standard lot, converted to the account currency). Conversion factors
+    are resolved once and memoized for as long as the same MarketSnapshot is
+    passed in, i.e. once per cycle.
+    """
+
+    def __init__(self):
+        self.market = None
+        self.factors = {}   # account currency -> USD→account factor
+
+    def conversion(self, market, account_currency):
+        """Multiplier from USD profit to account currency, memoized per snapshot."""
+        if market is not self.market:
+            self.market = market
+            self.factors.clear()
+        currency = account_currency.upper()
+        if currency not in self.factors:
+            factor = 1.0
+            if currency == "EUR":
+                eurusd = market.symbol_info_tick("EURUSD")
+                factor = 1.0 / eurusd.bid if eurusd and eurusd.bid > 0 else 0.92  # fallback conversion
+            self.factors[currency] = factor
+        return self.factors[currency]
+
+    def profit_arrays(self, is_buy, entry, volume, pip, bid, ask, market, account_currency="USD"):
+        """(profit_pips, profit) arrays; a NaN entry means "use the current bid"."""
+        current = np.where(is_buy, ask, bid)
+        entry = np.where(np.isnan(entry), bid, entry)
+        profit_pips = np.where(is_buy, current - entry, entry - current) / pip
+        profit = profit_pips * (10 * volume) * self.conversion(market, account_currency)
+        return np.round(profit_pips, 2), np.round(profit, 2)
+
+    def calc(self, orders, market, account_currency="USD"):
+        """
+        Returns (valid, profit_pips, profit) arrays aligned with orders.
+        Orders without a tick or symbol info are invalid and report 0.
+        """
+        symbols = [vo.symbol for vo in orders]
+        bid, ask = market.quotes(symbols)
+        valid = ~np.isnan(bid) & np.array([market.symbol_info(s) is not None for s in symbols], dtype=bool)
+
+        profit_pips, profit = self.profit_arrays(
+            np.array([vo.signal.lower() == "buy" for vo in orders], dtype=bool),
+            np.array([np.nan if vo.entry_price is None else vo.entry_price for vo in orders], dtype=float),
+            np.array([vo.volume for vo in orders], dtype=float),
+            np.array([0.01 if "JPY" in s else 0.0001 for s in symbols]),
+            bid, ask, market, account_currency,
+        )
+        return valid, np.where(valid, profit_pips, 0.0), np.where(valid, profit, 0.0)
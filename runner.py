@@ -1,7 +1,12 @@
+import asyncio
 import time
-import MetaTrader5 as mt5
 from account import Account
-#from journal import load_account_state, save_account_state
+from session import TerminalSession
+from scheduler import StageScheduler
+from journal import load_account_state, save_account_state
+from logs import get_logger, setup_logging
+
+log = get_logger("runner")
 
 # Time to stay logged into each account (in seconds)
 ACCOUNT_SESSION_TIME = 40
@@ -14,54 +19,65 @@ ROTATION_PAUSE = 3  # seconds between accounts
 ACCOUNTS = [
     # Account("Benchmark_USD", 1111111, "password", "BenchMark-Server"),
     # Account("Trades_EUR", 2222222, "password", "Trades-Server"),
+    # Parallel mode (supervisor.py) needs one terminal install per account:
+    # Account("Benchmark_USD", 1111111, "password", "BenchMark-Server", path=r"C:\MT5_1\terminal64.exe"),
 ]
 
+# Account stages of one full cycle, in this order (bench.py times the same list;
+# live sessions run them on their own triggers, see scheduler.default_jobs)
+STAGES = (
+    "begin_cycle",  # one market snapshot shared by all stages
+    "manage_daily_swap_updates",
+    "collect_positions",
+    "add_position_sl_tp",
+    "initialize_pending_orders",
+    "execute_pending_orders",
+    "monitor_virtual_orders",
+    "compare_open_pending_orders",
+    "print_pending_not_in_open",
+    "print_delay",
+    "execute_delay_orders",
+)
+
 
 def process_account(acc: Account):
-    print(f"\n🔐 Connecting to {acc.name} ({acc.login})...")
+    acc.log.info(f"🔐 Connecting ({acc.login})...")
     if not acc.connect():
-        print(f"{acc.name}: ❌ Connection failed.")
+        acc.log.error("❌ Connection failed.")
         return
 
-    # Load saved orders before running
-    # load_account_state(acc)
+    # Load saved orders before running (delay timers and bans survive restarts)
+    load_account_state(acc)
 
-    # Start trading session
-    print(f"{acc.name}: ▶️ Starting trading cycle...")
-    start_time = time.time()
+    # Start trading session: each stage runs on its own trigger (scheduler.default_jobs)
+    acc.log.info("▶️ Starting trading cycle...")
+    scheduler = StageScheduler(acc)
 
     try:
         # acc.session_init()  # initial virtual orders if needed
-        while time.time() - start_time < ACCOUNT_SESSION_TIME:
-            acc.manage_daily_swap_updates()
-            acc.collect_positions()
-            acc.add_position_sl_tp()
-            acc.initialize_pending_orders()
-            acc.execute_pending_orders()
-            acc.monitor_virtual_orders()
-            acc.compare_open_pending_orders()
-            acc.print_pending_not_in_open()
-            acc.print_delay()
-            acc.execute_delay_orders()
-            time.sleep(3)  # monitor every 3 seconds
+        asyncio.run(scheduler.run(duration=ACCOUNT_SESSION_TIME))
     except Exception as e:
-        print(f"{acc.name}: ⚠️ Error during session -> {e}")
+        acc.log.warning(f"⚠️ Error during session -> {e}")
+    acc.log.info(f"📊 Stage runs: {scheduler.summary()}")
 
-    # Save and logout
-    # save_account_state(acc)
-    mt5.shutdown()
+    # Save and hand the terminal to the next account (no shutdown: next connect is login-only)
+    save_account_state(acc, close=True)
     acc.connected = False
-    print(f"{acc.name}: 🔒 Logged out.\n")
+    acc.log.info("🔒 Session ended.")
     time.sleep(ROTATION_PAUSE)
 
 
 def main():
-    print(f"🚀 Starting account rotation ({len(ACCOUNTS)} accounts)...")
-    while True:
-        for acc in ACCOUNTS:
-            process_account(acc)
-        print("🔁 Completed full rotation — restarting...\n")
-        time.sleep(5)
+    setup_logging()
+    log.info(f"🚀 Starting account rotation ({len(ACCOUNTS)} accounts)...")
+    try:
+        while True:
+            for acc in ACCOUNTS:
+                process_account(acc)
+            log.info(f"🔁 Completed full rotation — terminal latency {TerminalSession.shared().latency()} — restarting...")
+            time.sleep(5)
+    finally:
+        TerminalSession.shutdown_all()
 
 
 if __name__ == "__main__":
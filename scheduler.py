@@ -0,0 +1,216 @@
+import asyncio
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime
+from account import SOFIA_TZ
+from config import SESSION_HEARTBEAT
+from journal import save_account_state
+from snapshot import MarketSnapshot
+
+
+# -------------------- TRIGGERS --------------------
+class Every:
+    """Fire every `seconds` (immediately on start unless first=False)."""
+
+    def __init__(self, seconds, first=True):
+        self.seconds = seconds
+        self.next = 0.0 if first else time.time() + seconds
+
+    async def wait(self, sched):
+        await asyncio.sleep(max(0.0, self.next - time.time()))
+        self.next = time.time() + self.seconds
+
+
+class BarClose:
+    """Fire just after each bar of `period` seconds closes (M5 by default), and once on start."""
+
+    def __init__(self, period=300, lag=2.0, first=True):
+        self.period = period
+        self.lag = lag      # give the terminal a moment to publish the new bar
+        self.first = first
+
+    async def wait(self, sched):
+        if self.first:
+            self.first = False
+            return
+        now = time.time()
+        boundary = (now // self.period + 1) * self.period
+        await asyncio.sleep(boundary + self.lag - now)
+
+
+class DailyWindow:
+    """
+    Fire inside each Sofia-time (start, end) window: every `every` seconds
+    while inside it, or once per window per day if every is None.
+
+    Polls the clock every `poll` seconds, so a scheduler started mid-window
+    still fires. When each window last fired is shared by account name
+    across schedulers, so the next session of the same account keeps the
+    same pace instead of starting over.
+    """
+
+    fired = {}      # (account name, window start) -> datetime it last fired
+
+    def __init__(self, *windows, every=None, poll=3.0, tz=SOFIA_TZ):
+        self.windows = [(dtime(*start), dtime(*end)) for start, end in windows]
+        self.every = every
+        self.poll = poll if every is None else min(poll, every)
+        self.tz = tz
+
+    def _due(self, acc):
+        now = datetime.now(self.tz)
+        for start, end in self.windows:
+            if start <= now.time() <= end:
+                key = (acc.name, start)
+                last = self.fired.get(key)
+                if self.every is None:
+                    due = last is None or last.date() != now.date()
+                else:
+                    due = last is None or (now - last).total_seconds() >= self.every
+                if due:
+                    self.fired[key] = now
+                    return True
+        return False
+
+    async def wait(self, sched):
+        while not self._due(sched.acc):
+            await asyncio.sleep(self.poll)
+
+
+class DelayDue:
+    """Fire when the earliest delay order reaches its time_execute."""
+
+    def __init__(self, poll=1.0):
+        self.poll = poll
+
+    async def wait(self, sched):
+        while True:
+            due = [vo.time_execute for vo in sched.acc.delay_orders if vo.time_execute is not None]
+            now = time.time()
+            if due and min(due) <= now:
+                return
+            await asyncio.sleep(min(self.poll, min(due) - now) if due else self.poll)
+
+
+class TickChange:
+    """
+    Fire when any open-order symbol has a new tick (time_msc advanced).
+
+    Polls the ticks on the MT5 executor every `poll` seconds and hands the
+    fresh quotes to the account as its MarketSnapshot, so the triggered
+    stages do not fetch them again.
+    """
+
+    def __init__(self, poll=0.5):
+        self.poll = poll
+        self.seen = {}      # symbol -> last time_msc
+
+    def _changed(self, acc):
+        symbols = acc.open_orders.symbols()
+        if not symbols:
+            return False
+        snap = MarketSnapshot(acc.server, ledger=acc.ledger)
+        stamps = {}
+        for symbol in symbols:
+            tick = snap.symbol_info_tick(symbol)
+            stamps[symbol] = tick.time_msc if tick else None
+        changed = any(stamps[s] != self.seen.get(s) for s in symbols)
+        self.seen = stamps
+        if changed:
+            acc.market = snap
+        return changed
+
+    async def wait(self, sched):
+        while not await sched.call(self._changed, sched.acc):
+            await asyncio.sleep(self.poll)
+
+
+# -------------------- JOBS --------------------
+# stages: Account method names (or callables taking the account), run in order.
+# fresh: run acc.begin_cycle() first so the stages see a new market snapshot.
+Job = namedtuple("Job", ["name", "trigger", "stages", "fresh"])
+
+
+def check_session(acc):
+    """Heartbeat stage: reconnect if the terminal went away."""
+    if not acc.session.alive() and not acc.connect():
+        raise ConnectionError(f"{acc.name}: terminal lost and reconnect failed")
+
+
+def default_jobs():
+    return [
+        Job("heartbeat", Every(SESSION_HEARTBEAT, first=False), (check_session,), False),
+        # collect_positions first so symbols with a live position never get a second one
+        Job("signals", BarClose(300),
+            ("collect_positions", "initialize_pending_orders", "execute_pending_orders", "add_position_sl_tp"), True),
+        Job("positions", Every(30), ("collect_positions", "add_position_sl_tp"), True),
+        Job("monitor", TickChange(0.5), ("monitor_virtual_orders",), False),
+        Job("delay", DelayDue(), ("execute_delay_orders", "add_position_sl_tp"), True),
+        # Pre-rollover swap closes re-run through the window (failed closes, late profits); reset once
+        Job("swap", DailyWindow(((23, 40), (23, 45)), every=3), ("manage_daily_swap_updates",), True),
+        Job("swap_reset", DailyWindow(((0, 16), (0, 20))), ("manage_daily_swap_updates",), True),
+        Job("journal", Every(1, first=False), (save_account_state,), False),
+        Job("diagnostics", Every(60), ("compare_open_pending_orders", "print_pending_not_in_open", "print_delay"), False),
+    ]
+
+
+class StageScheduler:
+    """
+    Runs Account stages on their own triggers instead of all of them every 3 s.
+
+    Each Job waits on its trigger in an asyncio task; when it fires, its
+    stages run on a single-thread executor, so every MT5 call (stages and
+    trigger polls alike) stays on one thread and never overlaps. An error
+    in a stage stops the scheduler and is re-raised from run().
+    """
+
+    def __init__(self, acc, jobs=None, on_run=None):
+        self.acc = acc
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.on_run = on_run    # callback(job_name, ms) after each job run
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mt5")
+        self.stats = {job.name: {"runs": 0, "ms": 0.0, "last": None} for job in self.jobs}
+
+    async def call(self, fn, *args):
+        """Run a blocking (MT5) call on the dedicated executor."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _run_stages(self, job):
+        if job.fresh:
+            self.acc.begin_cycle()
+        for stage in job.stages:
+            if callable(stage):
+                stage(self.acc)
+            else:
+                getattr(self.acc, stage)()
+
+    async def _loop(self, job):
+        while True:
+            await job.trigger.wait(self)
+            t = time.perf_counter()
+            await self.call(self._run_stages, job)
+            ms = (time.perf_counter() - t) * 1000
+            stat = self.stats[job.name]
+            stat["runs"] += 1
+            stat["ms"] += ms
+            stat["last"] = time.time()
+            if self.on_run:
+                self.on_run(job.name, ms)
+
+    async def run(self, duration=None):
+        """Run all jobs for duration seconds (forever if None)."""
+        tasks = [asyncio.create_task(self._loop(job), name=job.name) for job in self.jobs]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()   # re-raise the stage error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=True)
+
+    def summary(self):
+        return {name: f"{s['runs']}x {s['ms'] / s['runs']:.1f}ms" if s["runs"] else "0x"
+                for name, s in self.stats.items()}
@@ -0,0 +1,115 @@
+import time
+from collections import deque
+from broker import mt5
+from config import SESSION_HEARTBEAT
+
+
+class TerminalSession:
+    """
+    One initialized MT5 terminal reused by every account that logs into it.
+
+    initialize() runs once and is skipped afterwards while the heartbeat
+    (terminal_info, at most every SESSION_HEARTBEAT seconds) says the
+    terminal is alive; login() only switches accounts, and is a no-op when
+    the requested login is already active. A login that fails on a dead
+    terminal re-initializes it and retries once. Call durations are kept
+    per operation for latency() reporting.
+    """
+    SHARED = {}     # terminal path (None = default) -> TerminalSession
+
+    def __init__(self, path=None, heartbeat=SESSION_HEARTBEAT):
+        self.path = path
+        self.heartbeat = heartbeat
+        self.initialized = False
+        self.login_id = None        # account currently logged in
+        self.last_beat = 0.0        # time of the last successful heartbeat
+        self.last_error = None
+        self.timings = {"initialize": deque(maxlen=100), "login": deque(maxlen=100)}
+        self.counts = {"initialize": 0, "login": 0, "login_reused": 0, "stale": 0}
+
+    @classmethod
+    def shared(cls, path=None):
+        if path not in cls.SHARED:
+            cls.SHARED[path] = cls(path)
+        return cls.SHARED[path]
+
+    def _timed(self, name, call):
+        t = time.perf_counter()
+        ok = call()
+        self.timings[name].append((time.perf_counter() - t) * 1000)
+        self.counts[name] += 1
+        if not ok:
+            self.last_error = mt5.last_error()
+        return ok
+
+    # -------------------- HEARTBEAT --------------------
+    def alive(self, force=False):
+        """True while the terminal answers and is connected to the broker (throttled)."""
+        if not self.initialized:
+            return False
+        if not force and time.time() - self.last_beat < self.heartbeat:
+            return True
+        info = mt5.terminal_info()
+        if info is None or not info.connected:
+            self.counts["stale"] += 1
+            self.initialized = False
+            self.login_id = None
+            return False
+        self.last_beat = time.time()
+        return True
+
+    # -------------------- CONNECT --------------------
+    def initialize(self, force=False):
+        """Initialize the terminal unless it is already up (force re-inits)."""
+        if not force and self.alive():
+            return True
+        if self.initialized:
+            mt5.shutdown()
+        args = (self.path,) if self.path else ()
+        self.initialized = bool(self._timed("initialize", lambda: mt5.initialize(*args)))
+        self.login_id = None
+        if self.initialized:
+            self.last_beat = time.time()
+        return self.initialized
+
+    def login(self, login, password, server):
+        """Make login the active account, reusing the running terminal."""
+        if self.login_id == login and self.alive():
+            self.counts["login_reused"] += 1
+            return True
+        if not self.initialize():
+            return False
+        ok = self._timed("login", lambda: mt5.login(login, password=password, server=server))
+        if not ok and not self.alive(force=True) and self.initialize():
+            ok = self._timed("login", lambda: mt5.login(login, password=password, server=server))
+        self.login_id = login if ok else None
+        return bool(ok)
+
+    def shutdown(self):
+        if self.initialized:
+            mt5.shutdown()
+        self.initialized = False
+        self.login_id = None
+
+    @classmethod
+    def shutdown_all(cls):
+        for session in cls.SHARED.values():
+            session.shutdown()
+
+    # -------------------- STATS --------------------
+    def last_ms(self, name):
+        return self.timings[name][-1] if self.timings[name] else None
+
+    def latency(self):
+        """{operation: {count, last_ms, mean_ms, max_ms}} plus reuse/stale counters."""
+        out = {}
+        for name, values in self.timings.items():
+            out[name] = {
+                "count": self.counts[name],
+                "last_ms": round(values[-1], 1) if values else None,
+                "mean_ms": round(sum(values) / len(values), 1) if values else None,
+                "max_ms": round(max(values), 1) if values else None,
+            }
+        out["login_reused"] = self.counts["login_reused"]
+        out["stale"] = self.counts["stale"]
+        return out
@@ -0,0 +1,158 @@
+import numpy as np
+from bar_cache import BarCache
+from config import FAST, SLOW
+
+SIGNALS = {1: "buy", -1: "sell", 0: None}
+
+
+class EmaSignalEngine:
+    """
+    Incremental FAST/SLOW EMA signal per (symbol, timeframe).
+
+    Keeps the adjusted EWM sums (same result as pandas ``ewm(span).mean()``)
+    for every closed bar already processed and only reads bars newer than
+    the last one it has seen from the BarCache, so each update costs O(new bars).
+    The still-forming bar is applied on top of the state but never stored.
+
+    Each result is memoized with the tick (time_msc, bid) it was computed
+    at. Bars only change when a tick arrives, so given the current ticks
+    update_many() answers symbols whose tick is unchanged from the memo
+    without touching the terminal. A result is memoized only once the
+    fetched forming bar reflects that tick (close == bid).
+
+    State lives in NumPy arrays (one row per symbol, columns fast/slow) so a
+    whole symbol universe is advanced in one vectorized pass by update_many().
+    """
+
+    def __init__(self, fast=FAST, slow=SLOW, cache=None, capacity=128):
+        self.fast = fast
+        self.slow = slow
+        self.cache = cache or BarCache()
+        self.timeframe = self.cache.timeframe
+        self.decay = np.array([1.0 - 2.0 / (fast + 1), 1.0 - 2.0 / (slow + 1)])
+        self.rows = {}                                       # symbol -> state row
+        self.last_time = np.zeros(capacity, dtype=np.int64)  # last closed bar folded in
+        self.count = np.zeros(capacity, dtype=np.int64)      # closed bars folded in
+        self.num = np.zeros((capacity, 2))
+        self.den = np.zeros((capacity, 2))
+        self.memo = {}          # symbol -> ((tick time_msc, bid), signal)
+        self.stats = {"evaluated": 0, "memo_hits": 0}
+
+    def reset(self, symbol=None):
+        """Drop stored state for one symbol (or all) so it is rebuilt from the cached bars."""
+        if symbol is None:
+            rows = list(self.rows.values())
+            self.memo.clear()
+        else:
+            rows = [self.rows[symbol]] if symbol in self.rows else []
+            self.memo.pop(symbol, None)
+        self.last_time[rows] = 0
+        self.count[rows] = 0
+        self.num[rows] = 0.0
+        self.den[rows] = 0.0
+
+    def _row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = self.rows[symbol] = len(self.rows)
+            if row >= len(self.count):
+                grow = len(self.count)
+                self.last_time = np.concatenate([self.last_time, np.zeros(grow, dtype=np.int64)])
+                self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+                self.num = np.vstack([self.num, np.zeros((grow, 2))])
+                self.den = np.vstack([self.den, np.zeros((grow, 2))])
+        return row
+
+    def update(self, symbol, tick=None):
+        """Fold in new bars for symbol and return "buy" / "sell" / None."""
+        return self.update_many([symbol], {symbol: tick}).get(symbol)
+
+    def update_many(self, symbols, ticks=None):
+        """
+        Fold in new bars for every symbol and return {symbol: "buy" / "sell" / None}.
+
+        ticks ({symbol: tick}) lets symbols with the same tick as their
+        memoized result skip the terminal; without it every symbol is
+        re-read from the cache.
+
+        New closes are right-aligned into one (symbols x bars) array padded
+        with NaN on the left, and both EMAs for all symbols advance in a
+        single weighted sum instead of one pandas frame per symbol.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        ticks = ticks or {}
+        stamps = {}
+        out = {}
+        stale = []
+        for symbol in symbols:
+            tick = ticks.get(symbol)
+            stamps[symbol] = (tick.time_msc, tick.bid) if tick else None
+            memo = self.memo.get(symbol)
+            if memo is not None and stamps[symbol] is not None and memo[0] == stamps[symbol]:
+                out[symbol] = memo[1]
+            else:
+                stale.append(symbol)
+        self.stats["memo_hits"] += len(out)
+        if not stale:
+            return out
+        self.stats["evaluated"] += len(stale)
+        rows = np.array([self._row(s) for s in stale])
+
+        # --- Pull the unseen tail of every symbol from the bar cache ---
+        fetched = np.zeros(len(stale), dtype=bool)
+        tails = []
+        for i, (symbol, row) in enumerate(zip(stale, rows)):
+            if self.cache.update(symbol):
+                fetched[i] = True
+                tails.append(self.cache.since(symbol, self.last_time[row]))
+            else:
+                tails.append(None)
+
+        new = np.array([0 if t is None else len(t) for t in tails])
+        width = int(new.max())
+        closes = np.full((len(stale), width), np.nan)
+        for i, tail in enumerate(tails):
+            if new[i]:
+                closes[i, width - new[i]:] = tail["close"]
+                if new[i] > 1:
+                    self.last_time[rows[i]] = tail["time"][-2]
+
+        num = self.num[rows]
+        den = self.den[rows]
+
+        # --- Fold every closed bar into the running sums ---
+        if width > 1:
+            closed = np.maximum(new - 1, 0)
+            hist = closes[:, :-1]
+            valid = ~np.isnan(hist)
+            weights = self.decay[:, None] ** np.arange(width - 2, -1, -1)   # (2, bars)
+            scale = self.decay ** closed[:, None]
+            num = num * scale + np.where(valid, hist, 0.0) @ weights.T
+            den = den * scale + valid @ weights.T
+            self.num[rows] = num
+            self.den[rows] = den
+            self.count[rows] += closed
+
+        # --- Apply the forming bar without storing it ---
+        bars = self.count[rows].copy()
+        if width:
+            forming = new > 0
+            num = np.where(forming[:, None], num * self.decay + closes[:, -1:], num)
+            den = np.where(forming[:, None], den * self.decay + 1.0, den)
+            bars += forming
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ema = num / den
+        spread = ema[:, 0] - ema[:, 1]
+
+        # Signal logic
+        signal = np.sign(np.nan_to_num(spread)).astype(int)
+        signal[(bars < self.slow) | ~fetched | np.isnan(spread)] = 0
+
+        for symbol, i, s in zip(stale, range(len(stale)), signal.tolist()):
+            out[symbol] = SIGNALS[s]
+            stamp = stamps[symbol]
+            # Memoize only once the cached forming bar has caught up with the tick
+            if fetched[i] and stamp is not None and new[i] and closes[i, -1] == stamp[1]:
+                self.memo[symbol] = (stamp, SIGNALS[s])
+        return {symbol: out[symbol] for symbol in symbols}
@@ -0,0 +1,449 @@
+import time
+import zlib
+from collections import Counter, namedtuple
+import numpy as np
+
+# -------------------- MT5 CONSTANTS (same values as the MetaTrader5 package) --------------------
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900, TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600, TIMEFRAME_H4: 14400, TIMEFRAME_D1: 86400,
+}
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+SYMBOL_TRADE_MODE_FULL = 4
+
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_POSITION_CLOSED = 10036
+TRADE_RETCODE_INVALID_PARAMS = 10035
+TRADE_RETCODE_INVALID_FILL = 10030
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+# -------------------- RECORD TYPES (field names match MetaTrader5) --------------------
+AccountInfo = namedtuple("AccountInfo", [
+    "login", "name", "server", "currency", "leverage", "balance", "equity", "profit",
+    "margin", "margin_free", "margin_level", "margin_so_mode", "margin_so_call", "margin_so_so",
+])
+TerminalInfo = namedtuple("TerminalInfo", ["connected", "trade_allowed", "path", "ping_last"])
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "path", "visible", "select", "digits", "point", "spread", "trade_mode",
+    "trade_stops_level", "filling_mode", "trade_contract_size", "volume_min", "volume_step",
+    "swap_long", "swap_short", "currency_base", "currency_profit", "time", "bid", "ask",
+])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "time_msc", "type", "magic", "identifier", "volume",
+    "price_open", "sl", "tp", "price_current", "swap", "profit", "symbol", "comment",
+])
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment", "request_id", "request",
+])
+
+CURRENCIES = ("EUR", "USD", "GBP", "JPY", "AUD", "NZD", "CAD", "CHF", "NOK", "SEK", "ZAR", "MXN", "CNH")
+
+
+def make_symbols(count, currency="USD"):
+    """count FX-like symbol names containing currency: real crosses first, then synthetic ones."""
+    names = [a + b for a in CURRENCIES for b in CURRENCIES if a != b and currency in (a, b)]
+    names += [f"{currency}X{i:04d}" for i in range(max(0, count - len(names)))]
+    return names[:count]
+
+
+class _Series:
+    """Synthetic or recorded bars for one (symbol, timeframe)."""
+
+    def __init__(self, rates, rng=None, vol=0.0):
+        self.rates = rates
+        self.rng = rng
+        self.vol = vol
+
+
+class SimBroker:
+    """
+    Offline MetaTrader5 stand-in driven by synthetic or recorded price series.
+
+    Implements the subset the bot uses (initialize/login/shutdown, account_info,
+    symbols_get, symbol_info(_tick), copy_rates_range/copy_rates_from_pos,
+    positions_get, order_send, order_calc_margin) with fills at the current
+    quote. Every call is counted in self.calls and can be delayed by an
+    injectable per-call latency (seconds, float or {call_name: seconds}).
+
+    Synthetic bars are a seeded random walk per symbol, so runs are
+    reproducible; load_rates() replaces a symbol's series with recorded bars.
+    clock defaults to time.time; pass another callable to replay history.
+    """
+
+    def __init__(self, symbols=None, currency="USD", latency=0.0, seed=0, clock=None,
+                 history_days=3, tick_interval=1.0, balance=10000.0, leverage=100):
+        self.symbols = list(symbols) if symbols is not None else make_symbols(60, currency)
+        self.currency = currency
+        self.latency = latency
+        self.seed = seed
+        self.clock = clock or time.time
+        self.history_days = history_days
+        self.tick_interval = tick_interval
+        self.default_balance = balance
+        self.default_leverage = leverage
+        self.calls = Counter()
+        self.accounts = {}          # login -> dict(password, server, currency, balance, leverage)
+        self.account = None         # logged-in login
+        self.initialized = False
+        self.error = (1, "Success")
+        self.series = {}
+        self.infos = {}
+        self.account_positions = {} # login -> {ticket: TradePosition}
+        self.next_ticket = 100000
+        self.path = None
+
+    # -------------------- INSTRUMENTATION --------------------
+    def _call(self, name):
+        self.calls[name] += 1
+        delay = self.latency.get(name, 0.0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    # -------------------- SESSION --------------------
+    def add_account(self, login, password="", server="Sim-Server", currency=None, balance=None, leverage=None):
+        self.accounts[login] = {
+            "password": password, "server": server, "currency": currency or self.currency,
+            "balance": self.default_balance if balance is None else balance,
+            "leverage": leverage or self.default_leverage,
+        }
+
+    def initialize(self, path=None, **kwargs):
+        self._call("initialize")
+        self.initialized = True
+        self.path = path
+        if "login" in kwargs:
+            return self.login(kwargs["login"], password=kwargs.get("password", ""), server=kwargs.get("server", ""))
+        return True
+
+    def login(self, login, password="", server="", timeout=None):
+        self._call("login")
+        if not self.initialized:
+            self.error = (-10004, "No IPC connection")
+            return False
+        if login not in self.accounts:
+            self.add_account(login, password, server or "Sim-Server")
+        acc = self.accounts[login]
+        if acc["password"] != password or (server and acc["server"] != server):
+            self.error = (-6, "Terminal: Authorization failed")
+            return False
+        self.account = login
+        self.error = (1, "Success")
+        return True
+
+    def shutdown(self):
+        self._call("shutdown")
+        self.initialized = False
+        self.account = None
+        return True
+
+    def last_error(self):
+        return self.error
+
+    def terminal_info(self):
+        self._call("terminal_info")
+        if not self.initialized:
+            return None
+        return TerminalInfo(True, True, self.path or "sim", 0)
+
+    def version(self):
+        return (500, 4000, "sim")
+
+    # -------------------- PRICES --------------------
+    def _symbol_seed(self, symbol, timeframe):
+        return (zlib.crc32(symbol.encode()) ^ (self.seed * 7919) ^ timeframe) & 0xFFFFFFFF
+
+    def _spec(self, symbol):
+        digits = 3 if "JPY" in symbol else 5
+        return digits, 10.0 ** -digits
+
+    def _series(self, symbol, timeframe=TIMEFRAME_M5):
+        key = (symbol, timeframe)
+        series = self.series.get(key)
+        period = TIMEFRAME_SECONDS[timeframe]
+        now_bar = int(self.clock()) // period * period
+        if series is None:
+            rng = np.random.default_rng(self._symbol_seed(symbol, timeframe))
+            base = 150.0 if "JPY" in symbol else 0.6 + rng.random()
+            start = now_bar - int(self.history_days * 86400) // period * period
+            first = np.zeros(1, dtype=RATES_DTYPE)
+            first["time"] = start
+            first["open"] = first["high"] = first["low"] = first["close"] = base
+            series = self.series[key] = _Series(first, rng, vol=0.0004 * np.sqrt(period / 300))
+        last = int(series.rates["time"][-1])
+        if series.rng is not None and now_bar > last:
+            n = (now_bar - last) // period
+            steps = np.exp(np.cumsum(series.rng.normal(0.0, series.vol, n)))
+            closes = series.rates["close"][-1] * steps
+            opens = np.concatenate([[series.rates["close"][-1]], closes[:-1]])
+            wick = np.abs(series.rng.normal(0.0, series.vol / 2, n)) * closes
+            new = np.zeros(n, dtype=RATES_DTYPE)
+            new["time"] = last + period * np.arange(1, n + 1)
+            new["open"] = opens
+            new["close"] = closes
+            new["high"] = np.maximum(opens, closes) + wick
+            new["low"] = np.minimum(opens, closes) - wick
+            new["tick_volume"] = series.rng.integers(20, 400, n)
+            new["spread"] = 10
+            series.rates = np.concatenate([series.rates, new])
+        return series
+
+    def load_rates(self, symbol, rates, timeframe=TIMEFRAME_M5):
+        """Replay recorded bars (structured array with the MT5 rates dtype) for symbol."""
+        rates = np.asarray(rates)
+        self.series[(symbol, timeframe)] = _Series(rates.astype(RATES_DTYPE, copy=False))
+        if symbol not in self.symbols:
+            self.symbols.append(symbol)
+
+    def _rates_until_now(self, symbol, timeframe):
+        series = self._series(symbol, timeframe)
+        now = self.clock()
+        rates = series.rates[:np.searchsorted(series.rates["time"], now, side="right")]
+        if len(rates) and series.rng is not None:
+            # Forming bar: close moves with the current quote
+            rates = rates.copy()
+            bid = self._bid(symbol, now)
+            rates["close"][-1] = bid
+            rates["high"][-1] = max(rates["high"][-1], bid)
+            rates["low"][-1] = min(rates["low"][-1], bid)
+        return rates
+
+    def _bid(self, symbol, now):
+        series = self._series(symbol)
+        rates = series.rates
+        i = max(0, np.searchsorted(rates["time"], now, side="right") - 1)
+        bar = rates[i]
+        if series.rng is None:
+            return float(bar["close"])
+        # Deterministic intra-bar path from open to close, updated every tick_interval seconds
+        t = now // self.tick_interval * self.tick_interval
+        frac = min(1.0, (t - bar["time"]) / 300.0)
+        wobble = np.sin(t * 0.7 + zlib.crc32(symbol.encode()) % 97) * series.vol * 0.3 * (1 - frac)
+        digits, _ = self._spec(symbol)
+        return round(float(bar["open"] + (bar["close"] - bar["open"]) * frac) * (1 + wobble), digits)
+
+    def _tick(self, symbol):
+        now = self.clock()
+        digits, point = self._spec(symbol)
+        bid = self._bid(symbol, now)
+        t = now // self.tick_interval * self.tick_interval
+        return Tick(int(t), bid, round(bid + 10 * point, digits), 0.0, 0, int(t * 1000), 6, 0.0)
+
+    # -------------------- SYMBOLS --------------------
+    def symbols_get(self, group=None):
+        self._call("symbols_get")
+        if not self.initialized:
+            return None
+        return tuple(self._info(s) for s in self.symbols)
+
+    def _info(self, symbol):
+        info = self.infos.get(symbol)
+        if info is None:
+            digits, point = self._spec(symbol)
+            rng = np.random.default_rng(self._symbol_seed(symbol, 0))
+            info = SymbolInfo(
+                name=symbol, path=f"Forex\\{symbol}", visible=True, select=True, digits=digits,
+                point=point, spread=10, trade_mode=SYMBOL_TRADE_MODE_FULL, trade_stops_level=10,
+                filling_mode=ORDER_FILLING_IOC, trade_contract_size=100000.0, volume_min=0.01,
+                volume_step=0.01, swap_long=round(float(rng.normal(-2, 3)), 2),
+                swap_short=round(float(rng.normal(-2, 3)), 2), currency_base=symbol[:3],
+                currency_profit=symbol[3:6], time=0, bid=0.0, ask=0.0,
+            )
+            self.infos[symbol] = info
+        tick = self._tick(symbol)
+        return info._replace(time=tick.time, bid=tick.bid, ask=tick.ask)
+
+    def symbol_info(self, symbol):
+        self._call("symbol_info")
+        if not self.initialized or symbol not in self.symbols:
+            return None
+        return self._info(symbol)
+
+    def symbol_info_tick(self, symbol):
+        self._call("symbol_info_tick")
+        if not self.initialized or symbol not in self.symbols:
+            return None
+        return self._tick(symbol)
+
+    def symbol_select(self, symbol, enable=True):
+        self._call("symbol_select")
+        return symbol in self.symbols
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        self._call("copy_rates_range")
+        if not self.initialized or symbol not in self.symbols:
+            return None
+        rates = self._rates_until_now(symbol, timeframe)
+        t0, t1 = self._epoch(date_from), self._epoch(date_to)
+        lo = np.searchsorted(rates["time"], t0, side="left")
+        hi = np.searchsorted(rates["time"], t1, side="right")
+        return rates[lo:hi].copy()
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        self._call("copy_rates_from_pos")
+        if not self.initialized or symbol not in self.symbols:
+            return None
+        rates = self._rates_until_now(symbol, timeframe)
+        end = len(rates) - start_pos
+        return rates[max(0, end - count):max(0, end)].copy()
+
+    @staticmethod
+    def _epoch(value):
+        if hasattr(value, "timestamp"):
+            return int(value.timestamp())
+        return int(value)
+
+    # -------------------- ACCOUNT --------------------
+    def _floating(self):
+        profit = 0.0
+        margin = 0.0
+        for pos in self.positions.values():
+            tick = self._tick(pos.symbol)
+            pip = 0.01 if "JPY" in pos.symbol else 0.0001
+            if pos.type == POSITION_TYPE_BUY:
+                profit += (tick.bid - pos.price_open) / pip * 10 * pos.volume
+            else:
+                profit += (pos.price_open - tick.ask) / pip * 10 * pos.volume
+            margin += self._margin(pos.volume)
+        return profit, margin
+
+    def _margin(self, volume):
+        return volume * 100000.0 / self.accounts[self.account]["leverage"]
+
+    def account_info(self):
+        self._call("account_info")
+        return self._account_info()
+
+    def _account_info(self):
+        if not self.initialized or self.account is None:
+            return None
+        acc = self.accounts[self.account]
+        profit, margin = self._floating()
+        equity = acc["balance"] + profit
+        return AccountInfo(
+            login=self.account, name=f"Sim {self.account}", server=acc["server"],
+            currency=acc["currency"], leverage=acc["leverage"], balance=acc["balance"],
+            equity=round(equity, 2), profit=round(profit, 2), margin=round(margin, 2),
+            margin_free=round(equity - margin, 2),
+            margin_level=round(equity / margin * 100, 2) if margin else 0.0,
+            margin_so_mode=0, margin_so_call=50.0, margin_so_so=30.0,
+        )
+
+    def order_calc_margin(self, action, symbol, volume, price):
+        self._call("order_calc_margin")
+        if not self.initialized or self.account is None or symbol not in self.symbols:
+            return None
+        return round(self._margin(volume), 2)
+
+    # -------------------- POSITIONS & ORDERS --------------------
+    @property
+    def positions(self):
+        """Open positions of the logged-in account (ticket -> TradePosition)."""
+        return self.account_positions.setdefault(self.account, {})
+
+    def positions_get(self, symbol=None, ticket=None, group=None):
+        self._call("positions_get")
+        if not self.initialized:
+            return None
+        positions = self.positions.values()
+        if ticket is not None:
+            positions = [p for p in positions if p.ticket == ticket]
+        elif symbol is not None:
+            positions = [p for p in positions if p.symbol == symbol]
+        return tuple(positions)
+
+    def positions_total(self):
+        self._call("positions_total")
+        return len(self.positions)
+
+    def _result(self, retcode, request, order=0, deal=0, price=0.0, tick=None, comment=""):
+        return OrderSendResult(
+            retcode, deal, order, request.get("volume", 0.0), price,
+            tick.bid if tick else 0.0, tick.ask if tick else 0.0,
+            comment, 0, request,
+        )
+
+    def order_send(self, request):
+        self._call("order_send")
+        if not self.initialized or self.account is None:
+            self.error = (-10004, "No IPC connection")
+            return None
+        symbol = request.get("symbol")
+        if symbol not in self.symbols:
+            return self._result(TRADE_RETCODE_INVALID, request, comment="Invalid symbol")
+        tick = self._tick(symbol)
+
+        if request.get("action") == TRADE_ACTION_SLTP:
+            pos = self.positions.get(request.get("position"))
+            if pos is None:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, tick=tick, comment="Position doesn't exist")
+            self.positions[pos.ticket] = pos._replace(sl=request.get("sl", 0.0), tp=request.get("tp", 0.0))
+            return self._result(TRADE_RETCODE_DONE, request, tick=tick, comment="Request executed")
+
+        if request.get("action") != TRADE_ACTION_DEAL:
+            return self._result(TRADE_RETCODE_INVALID, request, tick=tick, comment="Unsupported action")
+        if request.get("volume", 0) <= 0:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, tick=tick, comment="Invalid volume")
+
+        fill = request.get("type_filling", ORDER_FILLING_IOC)
+        if fill not in (ORDER_FILLING_FOK, ORDER_FILLING_IOC):
+            return self._result(TRADE_RETCODE_INVALID_FILL, request, tick=tick, comment="Unsupported filling mode")
+
+        price = tick.ask if request.get("type") == ORDER_TYPE_BUY else tick.bid
+        self.next_ticket += 1
+        ticket = self.next_ticket
+
+        # --- Close an existing position ---
+        if request.get("position"):
+            pos = self.positions.pop(request["position"], None)
+            if pos is None:
+                return self._result(TRADE_RETCODE_POSITION_CLOSED, request, tick=tick, comment="Position doesn't exist")
+            pip = 0.01 if "JPY" in symbol else 0.0001
+            sign = 1 if pos.type == POSITION_TYPE_BUY else -1
+            self.accounts[self.account]["balance"] += sign * (price - pos.price_open) / pip * 10 * pos.volume
+            return self._result(TRADE_RETCODE_DONE, request, ticket, ticket, price, tick, "Request executed")
+
+        # --- Open a new position (position ticket == opening order ticket, as in MT5) ---
+        if self._margin(request["volume"]) > self._account_info().margin_free:
+            return self._result(TRADE_RETCODE_NO_MONEY, request, tick=tick, comment="No money")
+        now = self.clock()
+        self.positions[ticket] = TradePosition(
+            ticket=ticket, time=int(now), time_msc=int(now * 1000), type=request["type"],
+            magic=request.get("magic", 0), identifier=ticket, volume=request["volume"],
+            price_open=price, sl=request.get("sl", 0.0), tp=request.get("tp", 0.0),
+            price_current=price, swap=0.0, profit=0.0, symbol=symbol, comment=request.get("comment", ""),
+        )
+        return self._result(TRADE_RETCODE_DONE, request, ticket, ticket, price, tick, "Request executed")
+
+
+# Code reads constants as mt5.<NAME>, so expose them on the broker object too
+for _name, _value in list(globals().items()):
+    if _name.startswith(("TIMEFRAME_", "ORDER_", "POSITION_", "TRADE_", "SYMBOL_")) and isinstance(_value, int):
+        setattr(SimBroker, _name, _value)
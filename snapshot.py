@@ -0,0 +1,76 @@
+import numpy as np
+from broker import mt5
+from symbol_cache import SymbolMetaCache
+
+
+class MarketSnapshot:
+    """
+    Ticks, symbol info and account info captured once per process_account cycle.
+
+    Mirrors the read-only part of the MT5 API (symbols_get, symbol_info,
+    symbol_info_tick, account_info) so stages can call it instead of the
+    terminal. Each value is fetched at most once per snapshot; anything not
+    captured up front is fetched on first use and kept for the rest of the
+    cycle. Use refresh_tick() right before order_send for a live price.
+
+    Symbol info comes from the SymbolMetaCache (static contract fields only),
+    so it usually costs no terminal call at all. Account info comes from the
+    account's AccountLedger when one is given.
+    """
+
+    def __init__(self, server=None, meta=None, ledger=None):
+        self.server = server
+        self.meta = meta or SymbolMetaCache.shared()
+        self.ledger = ledger
+        self.ticks = {}
+        self.infos = {}
+        self.symbols = None
+        self.account = None
+
+    @classmethod
+    def capture(cls, symbols=(), server=None, meta=None, ledger=None):
+        """Build a snapshot: account info, symbol list/info, ticks for symbols."""
+        snap = cls(server, meta, ledger)
+        snap.account_info()
+        snap.symbols_get()
+        for symbol in symbols:
+            snap.symbol_info_tick(symbol)
+        return snap
+
+    def account_info(self):
+        if self.ledger is not None:
+            return self.ledger.account_info()
+        if self.account is None:
+            self.account = mt5.account_info()
+        return self.account
+
+    def symbols_get(self):
+        if self.symbols is None:
+            self.symbols = self.meta.symbols(self.server)
+        return self.symbols
+
+    def symbol_info(self, symbol):
+        if symbol not in self.infos:
+            self.infos[symbol] = self.meta.get(self.server, symbol)
+        return self.infos[symbol]
+
+    def symbol_info_tick(self, symbol):
+        if symbol not in self.ticks:
+            self.ticks[symbol] = mt5.symbol_info_tick(symbol)
+        return self.ticks[symbol]
+
+    def refresh_tick(self, symbol):
+        """Re-read the live tick for symbol (call right before sending an order)."""
+        self.ticks[symbol] = mt5.symbol_info_tick(symbol)
+        return self.ticks[symbol]
+
+    def quotes(self, symbols):
+        """(bid, ask) float arrays aligned with symbols; NaN where there is no tick."""
+        bid = np.full(len(symbols), np.nan)
+        ask = np.full(len(symbols), np.nan)
+        for i, symbol in enumerate(symbols):
+            tick = self.symbol_info_tick(symbol)
+            if tick:
+                bid[i] = tick.bid
+                ask[i] = tick.ask
+        return bid, ask
@@ -0,0 +1,215 @@
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+from config import LOG_FILE
+from logs import get_logger, setup_logging
+
+log = get_logger("supervisor")
+
+# Seconds without a heartbeat before a live worker is considered hung and restarted
+HEARTBEAT_TIMEOUT = 120
+
+# Restart backoff: RESTART_DELAY, doubled per consecutive crash, capped at RESTART_DELAY_MAX
+RESTART_DELAY = 5
+RESTART_DELAY_MAX = 300
+
+# A worker that ran this long without crashing resets its backoff
+STABLE_AFTER = 600
+
+# Seconds between aggregated status prints
+STATUS_INTERVAL = 30
+
+
+def account_spec(acc):
+    """Picklable constructor arguments of an Account (workers rebuild their own)."""
+    return {"name": acc.name, "login": acc.login, "password": acc.password,
+            "server": acc.server, "path": getattr(acc, "path", None)}
+
+
+def run_worker(spec, status):
+    """
+    Worker process: one Account on its own terminal, scheduled forever.
+
+    Posts a status dict to the status queue after every job run. Any error
+    ends the process with a non-zero exit code so the supervisor restarts
+    it with a fresh terminal connection.
+    """
+    # Own log file per worker: rotating one file from several processes is not safe
+    setup_logging(path=LOG_FILE and LOG_FILE.replace(".jsonl", f"_{spec['name']}.jsonl"))
+    from broker import mt5
+    from account import Account
+    from journal import load_account_state, save_account_state
+    from scheduler import StageScheduler
+
+    acc = Account(**spec)
+    runs = 0
+
+    def report(state, **extra):
+        status.put({"name": acc.name, "pid": os.getpid(), "state": state, "runs": runs,
+                    "open": len(acc.open_orders), "pending": len(acc.pending_orders),
+                    "delay": len(acc.delay_orders), "time": time.time(), **extra})
+
+    def on_run(job, ms):
+        nonlocal runs
+        runs += 1
+        report("running", job=job, cycle_ms=round(ms, 1))
+
+    report("connecting")
+    if not acc.connect():
+        report("error", error=f"connect failed: {mt5.last_error()}")
+        raise SystemExit(2)
+    load_account_state(acc)
+
+    try:
+        # Stages run on their own triggers; the heartbeat job reports at least every SESSION_HEARTBEAT
+        asyncio.run(StageScheduler(acc, on_run=on_run).run())
+    except KeyboardInterrupt:
+        report("stopped")
+    except Exception as e:
+        report("error", error=f"{type(e).__name__}: {e}", trace=traceback.format_exc())
+        raise SystemExit(1)
+    finally:
+        save_account_state(acc, close=True)
+        mt5.shutdown()
+
+
+class Supervisor:
+    """
+    Runs every account concurrently, one worker process per account.
+
+    The MT5 Python API talks to one terminal per process, so each account
+    needs its own terminal installation (Account.path). Workers report a
+    heartbeat after each job run; crashed workers and workers silent for
+    HEARTBEAT_TIMEOUT are restarted with exponential backoff. status()
+    aggregates the last heartbeat of every worker.
+    """
+
+    def __init__(self, accounts, context=None):
+        self.specs = [account_spec(acc) for acc in accounts]
+        self.ctx = context or mp.get_context("spawn")
+        self.queue = self.ctx.Queue()
+        self.workers = {}    # name -> dict(process, started, restarts, failures, next_start, last)
+
+        paths = [s["path"] for s in self.specs]
+        if len(self.specs) > 1 and (None in paths or len(set(paths)) < len(paths)):
+            log.warning("⚠️ Accounts without their own terminal path share one terminal — "
+                  "give each Account a distinct path=... for parallel mode.")
+
+    # -------------------- PROCESS CONTROL --------------------
+    def _start(self, spec):
+        w = self.workers.setdefault(spec["name"], {"restarts": -1, "failures": 0, "last": {}})
+        proc = self.ctx.Process(target=run_worker, args=(spec, self.queue),
+                                name=f"mt5-{spec['name']}", daemon=True)
+        proc.start()
+        w.update(process=proc, started=time.time(), next_start=None, spec=spec)
+        w["restarts"] += 1
+        log.info(f"🚀 {spec['name']}: worker started (pid {proc.pid})")
+
+    def _stop(self, w, timeout=10):
+        proc = w.get("process")
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+
+    def _schedule_restart(self, name, w, reason):
+        now = time.time()
+        w["failures"] = 0 if now - w["started"] >= STABLE_AFTER else w["failures"] + 1
+        delay = min(RESTART_DELAY * 2 ** max(w["failures"] - 1, 0), RESTART_DELAY_MAX)
+        w["next_start"] = now + delay
+        w["last"] = {**w["last"], "state": "restarting", "error": reason}
+        log.warning(f"🔁 {name}: {reason} → restarting in {delay:.0f}s")
+
+    # -------------------- MONITORING --------------------
+    def _drain(self):
+        while True:
+            try:
+                msg = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            w = self.workers.get(msg["name"])
+            if w is not None:
+                w["last"] = msg
+                if msg["state"] == "error":
+                    log.error(f"❌ {msg['name']}: {msg.get('error')}")
+
+    def check(self):
+        """Collect heartbeats, restart dead or hung workers; call periodically."""
+        self._drain()
+        now = time.time()
+        for name, w in self.workers.items():
+            proc = w["process"]
+            if w["next_start"] is not None:
+                if now >= w["next_start"]:
+                    self._start(w["spec"])
+                continue
+            if not proc.is_alive():
+                self._schedule_restart(name, w, f"worker exited with code {proc.exitcode}")
+                continue
+            beat = max(w["last"].get("time", 0), w["started"])
+            if now - beat > HEARTBEAT_TIMEOUT:
+                self._stop(w)
+                self._schedule_restart(name, w, f"no heartbeat for {now - beat:.0f}s")
+
+    def status(self):
+        """{name: last heartbeat + pid/alive/restarts/age} for every account."""
+        now = time.time()
+        out = {}
+        for name, w in self.workers.items():
+            last = {k: v for k, v in w["last"].items() if k != "trace"}
+            out[name] = {**last, "alive": w["process"].is_alive(), "restarts": w["restarts"],
+                         "age": round(now - last["time"], 1) if "time" in last else None}
+        return out
+
+    def print_status(self):
+        log.info(f"📋 {len(self.workers)} accounts:")
+        for name, s in self.status().items():
+            log.info(f"   {name:<16} {s.get('state', '?'):<11} alive={s['alive']!s:<5} restarts={s['restarts']} "
+                     f"runs={s.get('runs', 0)} (last {s.get('job', '-')} {s.get('cycle_ms', '-')} ms) "
+                     f"open={s.get('open', '-')} pending={s.get('pending', '-')} delay={s.get('delay', '-')} "
+                     f"last beat {'-' if s['age'] is None else s['age']}s ago")
+
+    # -------------------- MAIN LOOP --------------------
+    def start(self):
+        for spec in self.specs:
+            self._start(spec)
+
+    def stop(self):
+        for w in self.workers.values():
+            self._stop(w)
+        self._drain()
+        for w in self.workers.values():
+            w["last"] = {**w["last"], "state": "stopped"}
+
+    def run(self, duration=None):
+        """Start all workers and supervise until Ctrl+C (or duration seconds)."""
+        self.start()
+        started = last_print = time.time()
+        try:
+            while duration is None or time.time() - started < duration:
+                self.check()
+                if time.time() - last_print >= STATUS_INTERVAL:
+                    self.print_status()
+                    last_print = time.time()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            log.info("🛑 Stopping workers...")
+        finally:
+            self.stop()
+            self.print_status()
+
+
+def main():
+    from runner import ACCOUNTS
+    setup_logging()
+    log.info(f"🚀 Starting parallel mode ({len(ACCOUNTS)} accounts, one terminal each)...")
+    Supervisor(ACCOUNTS).run()
+
+
+if __name__ == "__main__":
+    main()
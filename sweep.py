@@ -0,0 +1,116 @@
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from config import FAST, SLOW, FIX_MARGIN_REAL, VOL_ST, VOL_MULT_FACTOR
+from backtest import Backtest, BarGrid, load_bars
+
+# Sweepable config.py settings -> Backtest keyword
+PARAMS = {
+    "FAST": "fast",
+    "SLOW": "slow",
+    "FIX_MARGIN_REAL": "margin_real",
+    "VOL_ST": "lot",
+    "VOL_MULT_FACTOR": "vol_mult",
+}
+
+# Per-process state set by _init_worker (the grid is memory-mapped, never pickled)
+_GRID = None
+_OPTIONS = {}
+
+
+def _init_worker(grid_dir, options):
+    global _GRID, _OPTIONS
+    _GRID = BarGrid.load(grid_dir, mmap_mode="r")
+    _OPTIONS = options
+
+
+def _evaluate(params):
+    kwargs = {PARAMS[name]: value for name, value in params.items()}
+    t = time.perf_counter()
+    summary = Backtest(**kwargs, **_OPTIONS).run(_GRID).summary()
+    exits = summary.pop("exits")
+    return {**params, **summary, **{f"exit_{k}": v for k, v in exits.items()},
+            "seconds": round(time.perf_counter() - t, 2)}
+
+
+def param_grid(space):
+    """Every combination of {NAME: [values]}; FAST must stay below SLOW."""
+    names = list(space)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    return [c for c in combos if c.get("FAST", FAST) < c.get("SLOW", SLOW)]
+
+
+def run_sweep(bars, space, workers=None, rank_by="profit", **options):
+    """
+    Backtest every parameter combination in space across a process pool.
+
+    bars ({symbol: rates} or BarGrid) is written once to a temporary
+    directory and memory-mapped read-only by each worker, so the OS shares
+    one copy of the data between processes. options go to every Backtest
+    (currency, meta, spread, ...). Returns a DataFrame ranked by rank_by
+    (ascending for max_drawdown, descending otherwise).
+    """
+    combos = param_grid(space)
+    grid = bars if isinstance(bars, BarGrid) else BarGrid.from_bars(bars)
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="sweep_") as grid_dir:
+        grid.save(grid_dir)
+        del grid
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(grid_dir, options)) as pool:
+            futures = [pool.submit(_evaluate, params) for params in combos]
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                rows.append(row)
+                label = " ".join(f"{name}={row[name]}" for name in space)
+                print(f"⏱ {done}/{len(combos)} {label} → P/L {row['profit']:+.2f}")
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.sort_values(rank_by, ascending=rank_by == "max_drawdown", kind="stable")
+    table.insert(0, "rank", range(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def _values(cast):
+    return lambda text: [cast(x) for x in text.split(",") if x]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep config.py strategy settings over local M5 bars.")
+    parser.add_argument("data", help="directory with <SYMBOL>.csv / <SYMBOL>.npy M5 bars")
+    parser.add_argument("--symbols", help="comma separated subset")
+    parser.add_argument("--fast", type=_values(int), default=[FAST])
+    parser.add_argument("--slow", type=_values(int), default=[SLOW])
+    parser.add_argument("--margin", type=_values(float), default=[FIX_MARGIN_REAL], help="FIX_MARGIN_REAL values")
+    parser.add_argument("--lot", type=_values(float), default=[VOL_ST], help="VOL_ST values")
+    parser.add_argument("--mult", type=_values(float), default=[VOL_MULT_FACTOR], help="VOL_MULT_FACTOR values")
+    parser.add_argument("--currency", default="USD")
+    parser.add_argument("--spread", type=float, default=10, help="points, where bars have no spread")
+    parser.add_argument("--workers", type=int, default=None, help="default: all CPU cores")
+    parser.add_argument("--rank", default="profit", help="profit, profit_pips, win_rate, max_drawdown, ...")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write the full ranked table to this CSV")
+    args = parser.parse_args(argv)
+
+    bars = load_bars(args.data, set(args.symbols.split(",")) if args.symbols else None)
+    space = {"FAST": args.fast, "SLOW": args.slow, "FIX_MARGIN_REAL": args.margin,
+             "VOL_ST": args.lot, "VOL_MULT_FACTOR": args.mult}
+    print(f"🔍 {len(param_grid(space))} combinations over {len(bars)} symbols")
+
+    table = run_sweep(bars, space, workers=args.workers, rank_by=args.rank,
+                      currency=args.currency, spread=args.spread)
+    print(table.head(args.top).to_string(index=False))
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"💾 Ranked table written to {args.out}")
+    return table
+
+
+if __name__ == "__main__":
+    main()
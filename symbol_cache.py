@@ -0,0 +1,119 @@
+import json
+import os
+import time
+from collections import namedtuple
+from broker import mt5
+from config import SYMBOL_META_TTL, SYMBOL_META_FILE
+from logs import get_logger
+
+# Contract fields that practically never change intraday
+SymbolMeta = namedtuple("SymbolMeta", [
+    "name", "point", "digits", "filling_mode", "trade_stops_level",
+    "trade_mode", "swap_long", "swap_short",
+])
+
+
+def to_meta(info):
+    return SymbolMeta(*(getattr(info, field) for field in SymbolMeta._fields))
+
+
+class SymbolMetaCache:
+    """
+    Static symbol contract data keyed by (server, symbol) with a TTL.
+
+    Entries (and the per-server symbol list) are reused until they are older
+    than ttl seconds or explicitly invalidated. With a path, the cache is
+    loaded on start and rewritten after bulk refreshes so a restart is warm.
+    """
+    SHARED = None
+
+    def __init__(self, ttl=SYMBOL_META_TTL, path=SYMBOL_META_FILE):
+        self.ttl = ttl
+        self.path = path
+        self.entries = {}   # (server, symbol) -> (fetched_at, SymbolMeta)
+        self.names = {}     # server -> (fetched_at, [symbol, ...])
+        if path:
+            self.load()
+
+    @classmethod
+    def shared(cls):
+        if cls.SHARED is None:
+            cls.SHARED = cls()
+        return cls.SHARED
+
+    def _fresh(self, fetched_at):
+        return time.time() - fetched_at < self.ttl
+
+    # -------------------- LOOKUPS --------------------
+    def get(self, server, symbol):
+        """Cached SymbolMeta, refetched via mt5.symbol_info when missing or expired."""
+        entry = self.entries.get((server, symbol))
+        if entry and self._fresh(entry[0]):
+            return entry[1]
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            return None
+        meta = to_meta(info)
+        self.entries[(server, symbol)] = (time.time(), meta)
+        return meta
+
+    def symbols(self, server):
+        """All cached SymbolMeta for server, refreshed in bulk via mt5.symbols_get when expired."""
+        entry = self.names.get(server)
+        if entry and self._fresh(entry[0]):
+            metas = [self.entries.get((server, name)) for name in entry[1]]
+            if all(metas):
+                return [m[1] for m in metas]
+        return self.store_all(server, mt5.symbols_get() or ())
+
+    def store_all(self, server, infos):
+        now = time.time()
+        metas = [to_meta(info) for info in infos]
+        for meta in metas:
+            self.entries[(server, meta.name)] = (now, meta)
+        if metas:
+            self.names[server] = (now, [m.name for m in metas])
+            self.save()
+        return metas
+
+    # -------------------- INVALIDATION --------------------
+    def invalidate(self, server=None, symbol=None):
+        """Drop entries matching server and/or symbol (everything if both are None)."""
+        for key in [k for k in self.entries
+                    if (server is None or k[0] == server) and (symbol is None or k[1] == symbol)]:
+            del self.entries[key]
+        if symbol is None:
+            for key in [s for s in self.names if server is None or s == server]:
+                del self.names[key]
+
+    # -------------------- PERSISTENCE --------------------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for server, block in data.items():
+            fetched_at = block.get("fetched_at", 0)
+            for row in block.get("symbols", []):
+                self.entries[(server, row[0])] = (fetched_at, SymbolMeta(*row))
+            self.names[server] = (fetched_at, [row[0] for row in block.get("symbols", [])])
+
+    def save(self):
+        if not self.path:
+            return
+        data = {}
+        for server, (fetched_at, names) in self.names.items():
+            rows = [list(self.entries[(server, n)][1]) for n in names if (server, n) in self.entries]
+            data[server] = {"fetched_at": fetched_at, "symbols": rows}
+        tmp = f"{self.path}.{os.getpid()}.tmp"     # per process: workers save concurrently
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            get_logger("symbols").warning(f"⚠️ Could not save symbol cache to {self.path}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
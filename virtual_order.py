@@ -0,0 +1,87 @@
+from config import FIX_MARGIN_REAL, VOL_MULT_FACTOR
+
+
+def order_distances(point, stop_level=0.0, exotic=False, margin=FIX_MARGIN_REAL, mult=VOL_MULT_FACTOR):
+    """
+    (real, virtual) TP/SL distance in price units: margin points, widened
+    by mult * 4 for exotic pairs and to at least twice the broker stop
+    level. Virtual levels sit at half the real distance.
+    """
+    base = margin * point
+    if exotic:
+        base *= mult * 4.0
+    real = max(base, stop_level * 2)
+    return real, real / 2
+
+
+class VirtualOrder:
+    """
+    One virtual/real order tracked by an Account.
+
+    Plain attributes in __slots__ instead of a ~20-key dict; all times are
+    epoch seconds (float). as_dict()/from_dict() convert for printing and
+    persistence, copy() builds variants such as delay orders.
+    """
+    __slots__ = (
+        "ticket", "symbol", "volume", "type", "signal",
+        "entry_price", "virtual_tp", "virtual_sl", "real_tp", "real_sl",
+        "spread", "fill_mode", "stop_level", "digits",
+        "linked_real_order", "linked_virtual_order", "virtual",
+        "time", "time_created", "time_execute", "comment",
+        "profit_pips", "profit",
+    )
+
+    def __init__(self, symbol, signal, volume, type, ticket=None,
+                 entry_price=None, virtual_tp=None, virtual_sl=None, real_tp=None, real_sl=None,
+                 spread=0.0, fill_mode=None, stop_level=0.0, digits=5,
+                 linked_real_order=None, linked_virtual_order=None, virtual=True,
+                 time=0.0, time_created=None, time_execute=None, comment="",
+                 profit_pips=0.0, profit=0.0):
+        self.ticket = ticket
+        self.symbol = symbol
+        self.volume = volume
+        self.type = type
+        self.signal = signal
+        self.entry_price = entry_price
+        self.virtual_tp = virtual_tp
+        self.virtual_sl = virtual_sl
+        self.real_tp = real_tp
+        self.real_sl = real_sl
+        self.spread = spread
+        self.fill_mode = fill_mode
+        self.stop_level = stop_level
+        self.digits = digits
+        self.linked_real_order = linked_real_order
+        self.linked_virtual_order = linked_virtual_order
+        self.virtual = virtual
+        self.time = time
+        self.time_created = time_created
+        self.time_execute = time_execute
+        self.comment = comment
+        self.profit_pips = profit_pips
+        self.profit = profit
+
+    def __repr__(self):
+        return (f"VirtualOrder({self.symbol} {self.signal} {self.volume} "
+                f"ticket={self.ticket} virtual={self.virtual})")
+
+    def as_dict(self):
+        d = {name: getattr(self, name) for name in self.__slots__}
+        if self.linked_virtual_order is not None:
+            d["linked_virtual_order"] = self.linked_virtual_order.as_dict()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        d = dict(d)
+        if d.get("linked_virtual_order") is not None:
+            d["linked_virtual_order"] = cls.from_dict(d["linked_virtual_order"])
+        return cls(**{k: v for k, v in d.items() if k in cls.__slots__})
+
+    def copy(self, **changes):
+        vo = VirtualOrder.__new__(VirtualOrder)
+        for name in self.__slots__:
+            setattr(vo, name, getattr(self, name))
+        for name, value in changes.items():
+            setattr(vo, name, value)
+        return vo